@@ -1,21 +1,53 @@
 from django.contrib import admin
-from .models import Cart, CartItem
+from django.db.models import DecimalField, F, Sum
+from .models import Cart, CartItem, StockHold
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
+    raw_id_fields = ('product',)
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'total_items', 'total_price', 'created_at')
+    list_display = ('user', 'items_total', 'price_total', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__email',)
     ordering = ('-created_at',)
+    show_full_result_count = False
     inlines = [CartItemInline]
     
     readonly_fields = ('total_items', 'total_price')
+    
+    def get_queryset(self, request):
+        # Totals come from one grouped query instead of iterating each cart's items
+        return super().get_queryset(request).annotate(
+            items_sum=Sum('items__quantity'),
+            price_sum=Sum(
+                F('items__quantity') * F('items__product__price'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+    
+    @admin.display(description='Total items', ordering='items_sum')
+    def items_total(self, obj):
+        return obj.items_sum or 0
+    
+    @admin.display(description='Total price', ordering='price_sum')
+    def price_total(self, obj):
+        return obj.price_sum or 0
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('cart', 'product', 'quantity', 'total_price')
     list_filter = ('created_at',)
+    list_select_related = ('cart__user', 'product')
     search_fields = ('cart__user__email', 'product__name')
+    raw_id_fields = ('cart', 'product')
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    list_display = ('product', 'cart', 'quantity', 'expires_at')
+    list_select_related = ('product', 'cart__user')
+    raw_id_fields = ('cart', 'product')
+    ordering = ('expires_at',)
+    show_full_result_count = False
@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Cart, CartItem, StockHold
+
+
+def abandoned_carts(cutoff):
+    """Carts with no activity since ``cutoff``: not saved, no item added and no hold extended."""
+    return Cart.objects.filter(updated_at__lt=cutoff).exclude(
+        Exists(CartItem.objects.filter(cart=OuterRef('pk'), created_at__gte=cutoff))
+    ).exclude(
+        Exists(StockHold.objects.filter(cart=OuterRef('pk'), expires_at__gte=cutoff))
+    )
+
+
+def empty_carts(cutoff):
+    return Cart.objects.filter(updated_at__lt=cutoff).exclude(
+        Exists(CartItem.objects.filter(cart=OuterRef('pk')))
+    )
+
+
+def archive_rows(carts):
+    """NDJSON lines for ``carts`` and their items."""
+    items = {}
+    for cart_id, product_id, quantity, created_at in CartItem.objects.filter(cart__in=carts).values_list(
+        'cart_id', 'product_id', 'quantity', 'created_at'
+    ):
+        items.setdefault(cart_id, []).append(
+            {'product_id': product_id, 'quantity': quantity, 'created_at': created_at}
+        )
+    for cart in carts.values('id', 'user_id', 'created_at', 'updated_at'):
+        cart['items'] = items.get(cart['id'], [])
+        yield json.dumps(cart, default=str) + '\n'
+
+
+def purge_in_batches(queryset, batch_size=1000, pause=0, archive=None):
+    """Delete the carts in ``queryset`` in primary-key order, ``batch_size`` at a time.
+
+    Each batch is a short transaction that re-applies the queryset's filters,
+    so a cart that became active since it was listed is left alone. Keyset
+    iteration (``pk > last``) keeps every batch query cheap however far it has
+    got. Returns ``(carts deleted, rows deleted including items and holds)``.
+    """
+    last_pk = 0
+    carts = rows = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return carts, rows
+        last_pk = ids[-1]
+        with transaction.atomic():
+            batch = queryset.filter(pk__in=ids)
+            if archive is not None:
+                archive.writelines(archive_rows(batch))
+            deleted, by_model = batch.delete()
+        carts += by_model.get(Cart._meta.label, 0)
+        rows += deleted
+        if pause:
+            time.sleep(pause)
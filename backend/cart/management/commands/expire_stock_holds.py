@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from cart.reservations import sweep_expired_holds
+
+class Command(BaseCommand):
+    help = 'Delete expired cart stock holds in batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help='Keep sweeping every N seconds')
+    
+    def handle(self, *args, **options):
+        while True:
+            deleted = sweep_expired_holds(options['batch_size'])
+            self.stdout.write(f'Deleted {deleted} expired stock holds')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from cart.cleanup import abandoned_carts, empty_carts, purge_in_batches
+
+class Command(BaseCommand):
+    help = 'Delete abandoned and empty carts in small batches, optionally archiving them first'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30, help='Days without activity before a cart is abandoned')
+        parser.add_argument('--empty-after', type=int, default=1, help='Days before an empty cart is deleted')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+        parser.add_argument('--archive', help='Append deleted carts and their items to this NDJSON file')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted')
+    
+    def handle(self, *args, **options):
+        now = timezone.now()
+        targets = [
+            ('empty', empty_carts(now - timedelta(days=options['empty_after']))),
+            ('abandoned', abandoned_carts(now - timedelta(days=options['older_than']))),
+        ]
+        if options['dry_run']:
+            for label, queryset in targets:
+                self.stdout.write(f'{label}: {queryset.count()} carts')
+            return
+        
+        archive = open(options['archive'], 'a', encoding='utf-8') if options['archive'] else None
+        try:
+            for label, queryset in targets:
+                started = time.monotonic()
+                carts, rows = purge_in_batches(
+                    queryset, batch_size=options['batch_size'], pause=options['pause'], archive=archive
+                )
+                elapsed = time.monotonic() - started
+                rate = rows / elapsed if elapsed else rows
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label}: deleted {carts} carts ({rows} rows) in {elapsed:.2f}s, {rate:.0f} rows/sec'
+                ))
+        finally:
+            if archive is not None:
+                archive.close()
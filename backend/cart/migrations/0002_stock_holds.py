@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_image_renditions'),
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='cart.cart')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'expires_at'], name='stockhold_product_expires_idx'), models.Index(fields=['expires_at'], name='stockhold_expires_idx')],
+                'unique_together': {('cart', 'product')},
+            },
+        ),
+    ]
@@ -35,3 +35,21 @@ class CartItem(models.Model):
     @property
     def total_price(self):
         return self.product.price * self.quantity
+
+class StockHold(models.Model):
+    """Stock set aside for a cart until ``expires_at``; expired holds are simply ignored."""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='holds')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ('cart', 'product')
+        indexes = [
+            # Active holds per product, for available-to-sell lookups
+            models.Index(fields=['product', 'expires_at'], name='stockhold_product_expires_idx'),
+            models.Index(fields=['expires_at'], name='stockhold_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity} for cart {self.cart_id}"
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from django.utils import timezone
+from products.cache import invalidate_catalog
+from products.models import Product
+
+from .models import StockHold
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        # {product_id: (name, available)}
+        self.shortages = shortages
+        super().__init__('; '.join(
+            f"Only {max(available, 0)} of '{name}' available" for name, available in shortages.values()
+        ))
+
+
+def held_quantities(product_ids, exclude_cart=None, now=None):
+    """``{product_id: quantity}`` held by unexpired holds, optionally ignoring one cart's."""
+    holds = StockHold.objects.filter(product_id__in=product_ids, expires_at__gt=now or timezone.now())
+    if exclude_cart is not None:
+        holds = holds.exclude(cart=exclude_cart)
+    return dict(holds.order_by().values('product_id').annotate(held=Sum('quantity')).values_list('product_id', 'held'))
+
+
+def _lock_stock(product_ids):
+    # Lock in primary key order so concurrent checkouts can't deadlock
+    return {
+        pk: (name, stock)
+        for pk, name, stock in Product.objects.select_for_update().filter(pk__in=product_ids)
+        .order_by('pk').values_list('pk', 'name', 'stock_quantity')
+    }
+
+
+def hold(cart, product, quantity):
+    """Reserve ``quantity`` of ``product`` for ``cart``, replacing its previous hold.
+
+    Raises InsufficientStock when other carts' holds leave too little. Every
+    hold in the cart is extended, so an active shopper keeps all their items.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.CART_HOLD_SECONDS)
+    with transaction.atomic():
+        name, stock = _lock_stock([product.pk])[product.pk]
+        available = stock - held_quantities([product.pk], exclude_cart=cart, now=now).get(product.pk, 0)
+        if quantity > available:
+            raise InsufficientStock({product.pk: (name, available)})
+        StockHold.objects.update_or_create(
+            cart=cart, product=product, defaults={'quantity': quantity, 'expires_at': expires_at}
+        )
+        StockHold.objects.filter(cart=cart).update(expires_at=expires_at)
+
+
+def release(cart, product=None):
+    holds = StockHold.objects.filter(cart=cart)
+    if product is not None:
+        holds = holds.filter(product=product)
+    holds.delete()
+
+
+def convert_holds(cart, quantities):
+    """Take ``{product_id: quantity}`` out of stock for checkout and drop the cart's holds.
+
+    Must run inside the order's transaction. Stock held by other carts is not
+    sold; the cart's own holds (even expired ones) are simply consumed.
+    """
+    now = timezone.now()
+    locked = _lock_stock(list(quantities))
+    held = held_quantities(list(quantities), exclude_cart=cart, now=now)
+    shortages = {}
+    for pk, quantity in quantities.items():
+        name, stock = locked.get(pk, ('', 0))
+        available = stock - held.get(pk, 0)
+        if quantity > available:
+            shortages[pk] = (name, available)
+    if shortages:
+        raise InsufficientStock(shortages)
+
+    Product.objects.filter(pk__in=quantities).update(
+        stock_quantity=Case(
+            *[When(pk=pk, then=F('stock_quantity') - quantity) for pk, quantity in quantities.items()],
+            default=F('stock_quantity'),
+            output_field=Product._meta.get_field('stock_quantity'),
+        ),
+        updated_at=now,
+    )
+    StockHold.objects.filter(cart=cart).delete()
+    # The catalog shows is_in_stock, which only changes when stock runs out
+    if any(locked[pk][1] == quantity for pk, quantity in quantities.items()):
+        transaction.on_commit(invalidate_catalog)
+
+
+def sweep_expired_holds(batch_size=1000):
+    """Delete expired holds in batches of primary keys; returns how many went."""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(StockHold.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += StockHold.objects.filter(pk__in=ids).delete()[0]
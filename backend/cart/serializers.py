@@ -1,8 +1,10 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
+from ecommerce_backend.serialization import DynamicFieldsMixin
 from .models import Cart, CartItem
 from products.serializers import ProductListSerializer
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -26,11 +28,20 @@ class CartItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Quantity must be greater than 0.")
         return value
 
-class CartSerializer(serializers.ModelSerializer):
+def cart_items_prefetch():
+    return Prefetch('items', queryset=CartItem.objects.select_related('product__category', 'product__rating_stats'))
+
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
     
+    prefetch_related_fields = {
+        'items': [cart_items_prefetch()],
+        'total_price': [cart_items_prefetch()],
+        'total_items': [cart_items_prefetch()],
+    }
+    
     class Meta:
         model = Cart
         fields = ['id', 'items', 'total_price', 'total_items', 'created_at', 'updated_at']
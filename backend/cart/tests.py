@@ -1,3 +1,64 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from products.models import Category, Product
+from .models import StockHold
+from .reservations import sweep_expired_holds
+
+
+class StockHoldTests(TestCase):
+
+    def setUp(self):
+        # Token buckets for add-to-cart live in the cache
+        cache.clear()
+        category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price='999.00', stock_quantity=3, category=category
+        )
+        self.clients = []
+        for number in range(2):
+            user = User.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}', password='secret',
+                first_name='User', last_name=str(number)
+            )
+            client = APIClient()
+            client.force_authenticate(user)
+            self.clients.append(client)
+
+    def add(self, client, quantity):
+        return client.post('/api/cart/add/', {'product_id': self.product.pk, 'quantity': quantity})
+
+    def available(self):
+        return self.clients[0].get(f'/api/products/{self.product.pk}/').json()['available_quantity']
+
+    def test_held_stock_is_refused_to_other_carts(self):
+        self.assertEqual(self.add(self.clients[0], 2).status_code, 201)
+        self.assertEqual(self.available(), 1)
+        response = self.add(self.clients[1], 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Only 1 of 'Notebook' available", response.json()['error'])
+        self.assertEqual(self.add(self.clients[1], 1).status_code, 201)
+        self.assertEqual(self.available(), 0)
+
+    def test_expired_holds_free_the_stock(self):
+        self.add(self.clients[0], 3)
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.available(), 3)
+        self.assertEqual(self.add(self.clients[1], 3).status_code, 201)
+        self.assertEqual(sweep_expired_holds(), 1)
+        self.assertEqual(StockHold.objects.count(), 1)
 
-# Create your tests here.
+    def test_checkout_consumes_the_hold(self):
+        self.add(self.clients[0], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.clients[0].post('/api/orders/create/', {'shipping_address': '1 Main St', 'phone': '555'})
+        self.assertEqual(response.status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 1)
+        self.assertFalse(StockHold.objects.exists())
+        self.assertEqual(self.available(), 1)
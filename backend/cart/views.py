@@ -2,22 +2,29 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from idempotency.decorators import idempotent
 from .models import Cart, CartItem
 from products.models import Product
 from .serializers import CartSerializer, AddToCartSerializer, UpdateCartItemSerializer
+from .reservations import InsufficientStock, hold, release
 
 class CartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
         cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(
+            cart, fields=request.query_params.get('fields'), expand=request.query_params.get('expand')
+        )
+        serializer.instance = serializer.optimize_queryset(Cart.objects.filter(pk=cart.pk)).get()
         return Response(serializer.data)
 
 class AddToCartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def post(self, request):
         serializer = AddToCartSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -28,17 +35,23 @@ class AddToCartView(APIView):
         cart, created = Cart.objects.get_or_create(user=request.user)
         product = get_object_or_404(Product, id=product_id, is_active=True)
         
-        # Check if item already exists in cart
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            # Update quantity if item already exists
-            cart_item.quantity += quantity
-            cart_item.save()
+        try:
+            with transaction.atomic():
+                # Check if item already exists in cart
+                cart_item, created = CartItem.objects.get_or_create(
+                    cart=cart,
+                    product=product,
+                    defaults={'quantity': quantity}
+                )
+                
+                if not created:
+                    # Update quantity if item already exists
+                    cart_item.quantity += quantity
+                    cart_item.save()
+                
+                hold(cart, product, cart_item.quantity)
+        except InsufficientStock as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             'message': 'Product added to cart successfully',
@@ -48,6 +61,7 @@ class AddToCartView(APIView):
 class UpdateCartItemView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def put(self, request, item_id):
         serializer = UpdateCartItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -59,10 +73,16 @@ class UpdateCartItemView(APIView):
         
         if quantity == 0:
             cart_item.delete()
+            release(cart, cart_item.product_id)
             message = 'Item removed from cart'
         else:
-            cart_item.quantity = quantity
-            cart_item.save()
+            try:
+                with transaction.atomic():
+                    hold(cart, cart_item.product, quantity)
+                    cart_item.quantity = quantity
+                    cart_item.save()
+            except InsufficientStock as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
             message = 'Cart item updated successfully'
         
         return Response({
@@ -73,10 +93,12 @@ class UpdateCartItemView(APIView):
 class RemoveFromCartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def delete(self, request, item_id):
         cart = get_object_or_404(Cart, user=request.user)
         cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
         cart_item.delete()
+        release(cart, cart_item.product_id)
         
         return Response({
             'message': 'Item removed from cart successfully',
@@ -86,9 +108,11 @@ class RemoveFromCartView(APIView):
 class ClearCartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def delete(self, request):
         cart = get_object_or_404(Cart, user=request.user)
         cart.items.all().delete()
+        release(cart)
         
         return Response({
             'message': 'Cart cleared successfully',
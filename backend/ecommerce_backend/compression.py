@@ -0,0 +1,148 @@
+import gzip
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ACCEPT_ENCODING = re.compile(r'\s*([a-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.IGNORECASE)
+
+
+def _gzip(data, level):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level, mode=brotli.MODE_TEXT)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+CODECS = {'br': _brotli if brotli else None, 'zstd': _zstd if zstandard else None, 'gzip': _gzip}
+
+
+def available_encodings():
+    """Configured encodings, in order of preference, whose library is installed."""
+    return [name for name in settings.COMPRESSION_ENCODINGS if CODECS.get(name)]
+
+
+def compress(data, encoding):
+    return CODECS[encoding](data, settings.COMPRESSION_LEVELS[encoding])
+
+
+def negotiate(accept_encoding, encodings):
+    """Pick the first of ``encodings`` the client accepts, or None."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        match = ACCEPT_ENCODING.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compressible(response):
+    """Whether the response body is a candidate for compression, whatever the client accepts."""
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type in settings.COMPRESSION_CONTENT_TYPES
+
+
+def shareable(request, response):
+    """Whether other clients are likely to get the same body: an anonymous request
+    whose response isn't marked private. Per-user bodies (cart, orders, profile)
+    never repeat, so caching their compressed copies would only churn the cache."""
+    if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    cache_control = response.get('Cache-Control', '').lower()
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+def compressed_body(data, encoding):
+    """Compress ``data``, reusing bytes already compressed for an identical body.
+
+    Catalog pages are the same for every anonymous client until the catalog
+    changes, so the compressed copy is stored in the cache under a digest of
+    the uncompressed bytes; hashing is far cheaper than compressing again.
+    """
+    if len(data) > settings.COMPRESSION_CACHE_MAX_SIZE:
+        return compress(data, encoding), False
+    key = 'compressed:{}:{}:{}'.format(
+        encoding, settings.COMPRESSION_LEVELS[encoding], hashlib.blake2b(data, digest_size=16).hexdigest()
+    )
+    body = cache.get(key)
+    if body is not None:
+        return body, True
+    body = compress(data, encoding)
+    cache.set(key, body, settings.COMPRESSION_CACHE_TIMEOUT)
+    return body, False
+
+
+class CompressionMiddleware:
+    """Compress API responses with brotli, zstd or gzip, as the client allows.
+
+    Only bodies of at least ``COMPRESSION_MIN_SIZE`` bytes with a content type in
+    ``COMPRESSION_CONTENT_TYPES`` are compressed. HTML is left out of the default
+    list because admin pages echo CSRF tokens next to user input (BREACH).
+    Static files are already served precompressed by WhiteNoise.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = available_encodings()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+
+        started = time.process_time()
+        if shareable(request, response):
+            body, reused = compressed_body(response.content, encoding)
+        else:
+            body, reused = compress(response.content, encoding), False
+        cpu = time.process_time() - started
+        if len(body) >= len(response.content):
+            return response
+
+        if settings.COMPRESSION_TIMING_HEADER:
+            response['Server-Timing'] = 'compress;dur={:.2f};desc="{} {}->{}{}"'.format(
+                cpu * 1000, encoding, len(response.content), len(body), ' cached' if reused else ''
+            )
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        # A strong ETag must not match the compressed representation (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,97 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+# Replicas are only used while serving a read-only request; commands, tasks and
+# anything outside the middleware always read from the primary.
+replicas_allowed = ContextVar('replicas_allowed', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_aliases():
+    return settings.REPLICA_DATABASES
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside the block. For filling caches that change events
+    evict: those fire on the primary's commit, before a lagging replica has the change."""
+    token = replicas_allowed.set(False)
+    try:
+        yield
+    finally:
+        replicas_allowed.reset(token)
+
+
+def pin_key(request):
+    """Identify the client without touching the database: bearer token, session, or IP."""
+    ident = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'primary-pin:' + hashlib.sha256(ident.encode()).hexdigest()
+
+
+class ReplicaRouter:
+    """Send reads of ``REPLICA_APPS`` models to a random replica when allowed.
+
+    Writes, ``select_for_update`` and reads inside a transaction on the primary
+    stay on ``default``, as do related lookups from objects loaded there.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = replica_aliases()
+        if not aliases or not replicas_allowed.get():
+            return None
+        if model._meta.app_label not in settings.REPLICA_APPS:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if connections['default'].in_atomic_block:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in replica_aliases()
+
+
+class ReplicaRoutingMiddleware:
+    """Allow replica reads for safe requests, except for clients that wrote recently.
+
+    A successful unsafe request pins its client to the primary for
+    ``REPLICA_PIN_SECONDS`` so it reads its own review, order or cart change
+    even if the replicas lag behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        token = replicas_allowed.set(safe and not cache.get(key))
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas_allowed.reset(token)
+        if not safe and response.status_code < 400:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,72 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ecommerce_backend.warmup import warmup_host
+
+class Command(BaseCommand):
+    help = 'Measure time from gunicorn start to the first served request, with and without preload and warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/api/products/', '/api/schema/'])
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        config = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        cases = [
+            ('default settings', ['-c', os.devnull]),
+            ('preload + warm-up', ['-c', config]),
+        ]
+        for label, args in cases:
+            self.stdout.write(f'{label}:')
+            for line in self.measure(args + ['--workers', str(options['workers'])], options['paths'], options['timeout']):
+                self.stdout.write(f'  {line}')
+
+    def measure(self, args, paths, timeout):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'ecommerce_backend.wsgi:application', '--bind', f'127.0.0.1:{port}', *args],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            lines = []
+            for path in paths:
+                latency = self.first_response(f'http://127.0.0.1:{port}{path}', started, timeout, process)
+                if not lines:
+                    lines.append(f'time to first response: {time.perf_counter() - started:.2f} s')
+                lines.append(f'{path:<24} first request {latency * 1000:8.1f} ms, '
+                             f'next {self.request(f"http://127.0.0.1:{port}{path}") * 1000:8.1f} ms')
+            return lines
+        finally:
+            process.terminate()
+            process.wait()
+
+    def first_response(self, url, started, timeout, process):
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise CommandError('gunicorn exited during startup')
+            try:
+                return self.request(url)
+            except (ConnectionError, urllib.error.URLError):
+                time.sleep(0.02)
+        raise CommandError(f'No response from {url} within {timeout} s')
+
+    def request(self, url):
+        request = urllib.request.Request(url, headers={'Host': warmup_host(), 'Accept': 'application/json'})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+        except urllib.error.HTTPError:
+            pass
+        return time.perf_counter() - started
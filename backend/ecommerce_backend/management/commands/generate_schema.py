@@ -0,0 +1,23 @@
+import glob
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ecommerce_backend.schema import code_version, render_schema, schema_path
+
+class Command(BaseCommand):
+    help = 'Write the OpenAPI schema for this code version to SCHEMA_CACHE_DIR so /api/schema/ never generates it'
+
+    def handle(self, *args, **options):
+        os.makedirs(settings.SCHEMA_CACHE_DIR, exist_ok=True)
+        current = set()
+        for version in schema_versions():
+            for fmt, body in render_schema(version).items():
+                path = schema_path(fmt, version)
+                with open(path, 'wb') as file:
+                    file.write(body)
+                current.add(path)
+                self.stdout.write(f'{path}: {len(body)} bytes')
+        for path in glob.glob(os.path.join(settings.SCHEMA_CACHE_DIR, 'openapi-*')):
+            if path not in current and not os.path.basename(path).startswith(f'openapi-{code_version()}'):
+                os.remove(path)
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+FINGERPRINT_FILE = '.collectstatic-fingerprint'
+
+
+def static_fingerprint():
+    """Digest of every file collectstatic would copy (path, size, mtime) and the storage used."""
+    digest = hashlib.sha256(settings.STATICFILES_STORAGE.encode())
+    for finder in get_finders():
+        for path, storage in finder.list([]):
+            stats = os.stat(storage.path(path))
+            digest.update(f'{path}\0{stats.st_size}\0{stats.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Apply pending migrations and collect static files, skipping each when there is nothing to do'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-migrate', action='store_true', help='Only collect static files (e.g. at image build time)')
+
+    def handle(self, *args, **options):
+        if not options['no_migrate']:
+            self.step('migrate', self.migrate)
+        self.step('collectstatic', self.collectstatic)
+
+    def step(self, name, call):
+        started = time.perf_counter()
+        outcome = call()
+        self.stdout.write(f'{name}: {outcome} ({(time.perf_counter() - started) * 1000:.0f} ms)')
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan:
+            return 'up to date, skipped'
+        call_command('migrate', interactive=False, verbosity=0)
+        return f'applied {len(plan)} migrations'
+
+    def collectstatic(self):
+        stamp = os.path.join(settings.STATIC_ROOT, FINGERPRINT_FILE)
+        fingerprint = static_fingerprint()
+        try:
+            with open(stamp) as file:
+                if file.read() == fingerprint:
+                    return 'unchanged, skipped'
+        except OSError:
+            pass
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(stamp, 'w') as file:
+            file.write(fingerprint)
+        return 'collected'
@@ -0,0 +1,155 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+HASHED_NAME = re.compile(r'\.([0-9a-f]{12})\.[^./]+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """Store uploads as ``name.<content hash>.ext``.
+
+    The name changes whenever the content does, so served media can be cached
+    forever, and re-uploading identical bytes reuses the existing file.
+    """
+
+    def save(self, name, content, max_length=None):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        stem, ext = os.path.splitext(name)
+        hashed = f'{stem}.{digest.hexdigest()[:12]}{ext.lower()}'
+        if self.exists(hashed):
+            return hashed.replace('\\', '/')
+        return super().save(hashed, content, max_length=max_length)
+
+
+class _FileRange:
+    """Expose ``length`` bytes of an open file, starting at its current offset.
+
+    ``fileno`` is kept so servers with ``wsgi.file_wrapper`` (gunicorn) can still
+    sendfile() the slice; they start at the current offset and stop at
+    Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _parse_range(header, size):
+    """Return ``(start, end)`` for a single byte range, None to send the whole file."""
+    match = RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        if int(end) == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def cache_headers(response, path, stats):
+    hashed = HASHED_NAME.search(path)
+    if hashed:
+        response['ETag'] = f'"{hashed.group(1)}"'
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['ETag'] = f'"{stats.st_size:x}-{stats.st_mtime_ns:x}"'
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    response['Last-Modified'] = http_date(stats.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT with caching headers and byte ranges.
+
+    Behind nginx set ``MEDIA_ACCEL_REDIRECT_PREFIX`` (or ``MEDIA_SENDFILE_HEADER``
+    for Apache/lighttpd) so the proxy sends the bytes and this view only checks
+    the path and sets headers.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(fullpath)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404('File not found')
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404('File not found')
+
+    probe = cache_headers(HttpResponseNotModified(), path, stats)
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        if probe['ETag'] in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return probe
+    else:
+        modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if modified_since is not None and int(stats.st_mtime) <= modified_since:
+            return probe
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX or settings.MEDIA_SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+            # nginx handles Range and conditional requests on internal locations itself;
+            # it takes a URI, so spaces and non-ASCII names must be percent-encoded
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(path)
+        else:
+            response[settings.MEDIA_SENDFILE_HEADER] = fullpath
+        return cache_headers(response, path, stats)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.headers.get('If-Range', probe['ETag']) == probe['ETag']:
+        try:
+            byte_range = _parse_range(range_header, stats.st_size)
+        except ValueError:
+            response = cache_headers(HttpResponse(status=416), path, stats)
+            response['Content-Range'] = f'bytes */{stats.st_size}'
+            return response
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_FileRange(file, end - start + 1), status=206, content_type=content_type)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{stats.st_size}'
+    response.block_size = settings.MEDIA_STREAM_BLOCK_SIZE
+    return cache_headers(response, path, stats)
@@ -0,0 +1,39 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what JSONRenderer produces for compact,
+    unicode, strict JSON: types orjson doesn't know (Decimal, datetime, lazy
+    strings, ...) go through DRF's own encoder, and U+2028/U+2029 are escaped
+    the same way. The one difference is that NaN and infinity become null
+    instead of raising. Indented output (e.g. the browsable API), other JSON
+    settings, or anything orjson refuses fall back to the stdlib path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        stdlib_only = (
+            orjson is None
+            or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON and api_settings.STRICT_JSON)
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        )
+        if stdlib_only:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,115 @@
+import hashlib
+import os
+from functools import lru_cache
+
+import django
+import drf_spectacular
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.settings import api_settings
+
+from .compression import available_encodings, compress, negotiate
+
+RENDERERS = {'yaml': OpenApiYamlRenderer, 'json': OpenApiJsonRenderer}
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """``CODE_VERSION`` (e.g. the deployed commit), else a digest of the project's sources and library versions."""
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION[:16]
+    digest = hashlib.sha256(f'{django.__version__}:{rest_framework.VERSION}:{drf_spectacular.__version__}'.encode())
+    roots = sorted({app.path for app in apps.get_app_configs() if app.path.startswith(str(settings.BASE_DIR))})
+    for root in roots:
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    stats = os.stat(os.path.join(directory, name))
+                    digest.update(f'{directory}/{name}\0{stats.st_size}\0{stats.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()[:16]
+
+
+def schema_versions():
+    """The versions a schema is served for: the default one (None) and ``ALLOWED_VERSIONS``."""
+    return [None, *(api_settings.ALLOWED_VERSIONS or ())]
+
+
+def schema_path(fmt, version=None):
+    suffix = f'-{version}' if version else ''
+    return os.path.join(settings.SCHEMA_CACHE_DIR, f'openapi-{code_version()}{suffix}.{fmt}')
+
+
+def render_schema(version=None):
+    """``{format: bytes}`` of the OpenAPI document, rendered as SpectacularAPIView would."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(api_version=version)
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        fmt: renderer().render(schema, renderer.media_type, {})
+        for fmt, renderer in RENDERERS.items()
+    }
+
+
+class SchemaDocument:
+    def __init__(self, body):
+        self.body = body
+        self.etag = 'W/"{}"'.format(hashlib.blake2b(body, digest_size=16).hexdigest())
+        self.encoded = {}
+
+    def content(self, encoding):
+        if encoding is None:
+            return self.body
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.body, encoding)
+        return self.encoded[encoding]
+
+
+@lru_cache(maxsize=None)
+def schema_documents(version=None):
+    """The schema in every format, read from the files written by ``generate_schema``
+    for this code version, or generated once in this process when there are none.
+    Only ``schema_versions()`` are accepted, which bounds the cache."""
+    if version not in schema_versions():
+        raise ValueError(f'Unknown API version {version!r}')
+    try:
+        bodies = {}
+        for fmt in RENDERERS:
+            with open(schema_path(fmt, version), 'rb') as file:
+                bodies[fmt] = file.read()
+    except OSError:
+        bodies = render_schema(version)
+    return {fmt: SchemaDocument(body) for fmt, body in bodies.items()}
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """``SpectacularAPIView`` serving prebuilt, precompressed bytes with an ETag
+    instead of introspecting every view per request."""
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        if version not in schema_versions():
+            # Any string is a valid version without ALLOWED_VERSIONS; don't build a document per string
+            version = None
+        document = schema_documents(version)[request.accepted_renderer.format]
+        if_none_match = request.headers.get('If-None-Match', '')
+        if document.etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            encoding = negotiate(request.headers.get('Accept-Encoding', ''), available_encodings())
+            content_type = request.accepted_renderer.media_type
+            if request.accepted_renderer.charset:
+                content_type += f'; charset={request.accepted_renderer.charset}'
+            response = HttpResponse(document.content(encoding), content_type=content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, version)}"'
+        response['ETag'] = document.etag
+        response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -0,0 +1,146 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+
+def parse_field_spec(value):
+    """``"id,items.quantity,items.price"`` -> ``{'id': [], 'items': ['quantity', 'price']}``."""
+    spec = {}
+    for path in value.split(','):
+        head, _, rest = path.strip().partition('.')
+        if head:
+            spec.setdefault(head, [])
+            if rest:
+                spec[head].append(rest)
+    return spec
+
+
+class DynamicFieldsMixin:
+    """Let clients pick fields with ``?fields=`` and add optional ones with ``?expand=``.
+
+    Both take comma separated names; a dotted name such as ``items.quantity``
+    is passed on to a nested serializer that also uses this mixin. Nested
+    serializers can be given ``fields``/``expand`` strings directly. Query
+    parameters are only read on safe methods, so writes always see every field.
+
+    ``expandable_fields`` maps names to factories for fields that are only
+    present when expanded. ``select_related_fields`` and ``prefetch_related_fields``
+    map fields to the lookups they need; ``optimize_queryset`` applies only
+    those of the selected fields.
+    """
+    expandable_fields = {}
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if fields is None and expand is None and request is not None and request.method in SAFE_METHODS:
+            params = getattr(request, 'query_params', request.GET)
+            fields = params.get('fields')
+            expand = params.get('expand')
+        self._field_spec = parse_field_spec(fields) if fields else None
+        self._expand_spec = parse_field_spec(expand) if expand else {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, factory in self.expandable_fields.items():
+            if name in self._expand_spec:
+                fields[name] = factory()
+        if self._field_spec is not None:
+            fields = {name: field for name, field in fields.items() if name in self._field_spec}
+
+        for name, field in fields.items():
+            nested = getattr(field, 'child', field)
+            if not isinstance(nested, DynamicFieldsMixin):
+                continue
+            if self._field_spec and self._field_spec.get(name):
+                nested._field_spec = parse_field_spec(','.join(self._field_spec[name]))
+            if self._expand_spec.get(name):
+                nested._expand_spec = parse_field_spec(','.join(self._expand_spec[name]))
+        return fields
+
+    def optimize_queryset(self, queryset):
+        select_related, prefetch_related = [], []
+        for name in self.fields:
+            select_related.extend(self.select_related_fields.get(name, ()))
+            prefetch_related.extend(self.prefetch_related_fields.get(name, ()))
+        if select_related:
+            queryset = queryset.select_related(*dict.fromkeys(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*dict.fromkeys(prefetch_related))
+        return queryset
+
+
+class FieldSelectionMixin:
+    """Views whose serializer supports ``optimize_queryset`` only join what the response needs."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_serializer()
+        if hasattr(serializer, 'optimize_queryset'):
+            queryset = serializer.optimize_queryset(queryset)
+        return queryset
+
+
+class ValuesRepresentationMixin:
+    """Serialize ``.values()`` rows without building model instances.
+
+    ``values_map`` maps output fields to the ``values()`` lookups they are read
+    from; those go through the declared field's ``to_representation`` so the
+    result is identical to the regular path. Any other readable field needs a
+    ``value_<field name>(row)`` method, with the lookups it reads listed under
+    its name in ``extra_values``. Only the lookups of selected fields are queried.
+    """
+    values_map = {}
+    extra_values = {}
+
+    def supports_values(self):
+        return all(
+            field.field_name in self.values_map or hasattr(self, f'value_{field.field_name}')
+            for field in self._readable_fields
+        )
+
+    def values_lookups(self):
+        lookups = []
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in self.values_map:
+                lookups.append(self.values_map[name])
+            else:
+                lookups.extend(self.extra_values.get(name, ()))
+        return list(dict.fromkeys(lookups))
+
+    def represent_values(self, rows):
+        fields = []
+        for field in self._readable_fields:
+            name = field.field_name
+            if name in self.values_map:
+                fields.append((name, self.values_map[name], field.to_representation))
+            else:
+                fields.append((name, None, getattr(self, f'value_{name}')))
+        result = []
+        for row in rows:
+            data = {}
+            for name, lookup, represent in fields:
+                if lookup is None:
+                    data[name] = represent(row)
+                else:
+                    value = row[lookup]
+                    data[name] = None if value is None else represent(value)
+            result.append(data)
+        return result
+
+
+class ValuesListMixin:
+    """List views whose serializer can represent plain rows skip building instances."""
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not (hasattr(serializer, 'represent_values') and serializer.supports_values()):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer.values_lookups())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.represent_values(page))
+        return Response(serializer.represent_values(queryset))
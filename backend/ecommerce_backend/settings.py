@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from corsheaders.defaults import default_headers
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,9 @@ LOCAL_APPS = [
     'products',
     'orders',
     'cart',
+    'taskqueue',
+    'idempotency',
+    'ecommerce_backend',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -45,12 +49,15 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'ecommerce_backend.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ecommerce_backend.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'ecommerce_backend.throttling.LoadSheddingMiddleware',
 ]
 
 ROOT_URLCONF = 'ecommerce_backend.urls'
@@ -83,6 +90,26 @@ DATABASES = {
     'default': dj_database_url.parse(config('DATABASE_URL', default='sqlite:///db.sqlite3'))
 }
 
+# Read replicas (ecommerce_backend.db_router): comma-separated URLs, added as replica1,
+# replica2, ... Reads of REPLICA_APPS models during GET requests go to a random replica,
+# except for clients that made a successful write in the last REPLICA_PIN_SECONDS.
+REPLICA_DATABASES = []
+for number, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{number}'] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica{number}')
+REPLICA_APPS = ['products']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+DATABASE_ROUTERS = ['ecommerce_backend.db_router.ReplicaRouter']
+
+# Shared by throttling, load shedding and the catalog caches. With several
+# gunicorn workers or hosts, point this at a shared cache (e.g. CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://host:6379/1)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -123,6 +150,59 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'ecommerce_backend.media.HashedFileSystemStorage'
+
+# Media serving (ecommerce_backend.media.serve_media). Content-hashed uploads are
+# cached for a year; other files for MEDIA_CACHE_MAX_AGE seconds. Behind nginx, point
+# MEDIA_ACCEL_REDIRECT_PREFIX at an internal location aliasing MEDIA_ROOT to let it
+# send the bytes; MEDIA_SENDFILE_HEADER (e.g. X-Sendfile) does the same for Apache.
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='')
+MEDIA_SENDFILE_HEADER = config('MEDIA_SENDFILE_HEADER', default='')
+MEDIA_STREAM_BLOCK_SIZE = 64 * 1024
+
+# Resized copies generated next to each product image and exposed as srcset
+PRODUCT_IMAGE_RENDITION_WIDTHS = [200, 400, 800]
+PRODUCT_IMAGE_RENDITION_FORMATS = ['webp', 'jpeg']
+PRODUCT_IMAGE_RENDITION_QUALITY = 80
+
+# Upper bounds of the price ranges counted by /api/products/facets/ (the last range is open)
+PRODUCT_PRICE_BUCKETS = [25, 50, 100, 250, 500, 1000]
+FACET_CACHE_TIMEOUT = 5 * 60
+FACET_CACHE_MAX_SEARCH_LENGTH = 100
+
+# In-process prefix index behind /api/products/suggest/ (products.suggest). Holds the
+# SUGGEST_MAX_PRODUCTS most popular active products (reviews plus units sold in the last
+# SUGGEST_POPULARITY_DAYS) and every category; rebuilt every SUGGEST_REBUILD_SECONDS.
+SUGGEST_MAX_PRODUCTS = config('SUGGEST_MAX_PRODUCTS', default=100000, cast=int)
+SUGGEST_POPULARITY_DAYS = 30
+SUGGEST_REBUILD_SECONDS = config('SUGGEST_REBUILD_SECONDS', default=15 * 60, cast=int)
+SUGGEST_TERMS_PER_NAME = 4
+SUGGEST_SCAN_LIMIT = 500
+SUGGEST_MAX_RESULTS = 20
+SUGGEST_MAX_QUERY_LENGTH = 100
+
+# Catalog change events (products.changes) keep per-process caches coherent across
+# workers and hosts: Postgres LISTEN/NOTIFY, or on other databases a CatalogChange
+# table polled every CHANGE_POLL_INTERVAL seconds ('auto' picks by database vendor)
+CHANGE_TRANSPORT = config('CHANGE_TRANSPORT', default='auto')
+CHANGE_POLL_INTERVAL = config('CHANGE_POLL_INTERVAL', default=1.0, cast=float)
+CHANGE_POLL_OVERLAP = 5
+CHANGE_RETENTION = 60 * 60
+CATEGORY_LIST_CACHE_SIZE = 100
+
+# API response compression (ecommerce_backend.compression). Encodings are tried in
+# order and skipped when their package (brotli, zstandard) isn't installed; gzip
+# always works. Compressed bodies of anonymous responses up to COMPRESSION_CACHE_MAX_SIZE
+# bytes are kept in the cache so identical responses (e.g. catalog pages) are
+# compressed only once.
+COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']
+COMPRESSION_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6}
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_CONTENT_TYPES = ['application/json', 'application/vnd.oai.openapi+json', 'text/csv']
+COMPRESSION_CACHE_MAX_SIZE = 512 * 1024
+COMPRESSION_CACHE_TIMEOUT = 10 * 60
+COMPRESSION_TIMING_HEADER = config('COMPRESSION_TIMING_HEADER', default=DEBUG, cast=bool)
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -136,11 +216,47 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # orjson-backed when installed, identical output to JSONRenderer either way
+        'ecommerce_backend.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'ecommerce_backend.throttling.TokenBucketThrottle',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Token buckets per URL name (ecommerce_backend.throttling): {scope: (burst, refill rate)}
+# with scope 'ip', 'user' (falls back to the IP when anonymous) or 'endpoint' (all
+# clients together). Refused requests get 429 with Retry-After.
+# Buckets and the load shedding counts below live in THROTTLE_CACHE. With the default
+# LocMemCache each worker process keeps its own, so N gunicorn workers allow up to N
+# times these limits (a warning is logged when DEBUG is off); use a shared cache
+# (Redis, Memcached or the database cache) to enforce them across workers.
+THROTTLE_CACHE = 'default'
+THROTTLE_EPOCH = 60 * 60
+THROTTLE_BUCKETS = {
+    'login': {'ip': (10, '5/min')},
+    'register': {'ip': (5, '10/hour')},
+    'search-products': {'user': (30, '60/min'), 'endpoint': (200, '50/s')},
+    'add-to-cart': {'user': (20, '30/min')},
+}
+
+# Maximum requests in flight per URL name across all workers; more get 503 with
+# Retry-After. Counts are kept per LOAD_SHEDDING_WINDOW seconds, which should be
+# longer than the worker timeout.
+LOAD_SHEDDING_LIMITS = {
+    'search-products': 8,
+    'product-export': 2,
+    'product-import': 2,
+    'sales-report': 4,
+}
+LOAD_SHEDDING_WINDOW = 60
+LOAD_SHEDDING_RETRY_AFTER = 2
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -197,6 +313,31 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# /api/schema/ serves files written by `manage.py generate_schema` for the current
+# CODE_VERSION (defaults to the deployed commit on Render, else a digest of the sources),
+# and otherwise generates the schema once per process
+CODE_VERSION = config('CODE_VERSION', default=config('RENDER_GIT_COMMIT', default=''))
+SCHEMA_CACHE_DIR = os.path.join(BASE_DIR, 'schema_cache')
+
+# Requested once in the gunicorn master before workers fork (see gunicorn.conf.py)
+WARMUP_PATHS = ['/api/categories/', '/api/products/', '/api/products/featured/', '/api/products/facets/', '/api/products/suggest/?q=a']
+
+# Background tasks (taskqueue app). Run workers with `python manage.py run_worker`;
+# TASK_ALWAYS_EAGER runs tasks in-process after commit instead.
+TASK_ALWAYS_EAGER = config('TASK_ALWAYS_EAGER', default=False, cast=bool)
+
+# How long items added to a cart keep their stock reserved, in seconds
+CART_HOLD_SECONDS = config('CART_HOLD_SECONDS', default=15 * 60, cast=int)
+
+# Idempotency-Key handling: how long stored responses are replayed, and after how
+# many seconds an unfinished request's key may be taken over by a retry
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=60, cast=int)
+
+# Email
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='orders@ecommerce.com')
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS', 
@@ -204,6 +345,7 @@ CORS_ALLOWED_ORIGINS = config(
 ).split(',')
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Production security settings
 if not DEBUG:
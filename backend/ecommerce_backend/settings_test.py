@@ -0,0 +1,13 @@
+"""Settings for the test suite: ``python manage.py test --settings=ecommerce_backend.settings_test``."""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+# A replica alias to check the routing against. It mirrors the test database and is
+# only used where tests enable it with override_settings(REPLICA_DATABASES=[...]).
+DATABASES = {**DATABASES}
+DATABASES.setdefault('replica1', {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}})
+
+# The cache coherence tests start processes on the test database, so SQLite keeps it
+# in a file rather than in memory
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'] = {**DATABASES['default'], 'TEST': {'NAME': str(BASE_DIR / 'test_db.sqlite3')}}
@@ -0,0 +1,45 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+
+class MediaServingTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name, MEDIA_ACCEL_REDIRECT_PREFIX='', MEDIA_SENDFILE_HEADER='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.name = 'products/café tray.0123456789ab.txt'
+        os.makedirs(os.path.join(directory.name, 'products'))
+        with open(os.path.join(directory.name, self.name), 'wb') as file:
+            file.write(b'0123456789')
+
+    def get(self, path=None, **headers):
+        return self.client.get(f'/media/{path or self.name}', headers=headers)
+
+    def test_hashed_files_are_cached_for_good(self):
+        response = self.get()
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.get(If_None_Match=response['ETag']).status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.get(Range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(b''.join(self.get(Range='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.get(Range='bytes=20-').status_code, 416)
+
+    def test_paths_outside_media_root_are_not_served(self):
+        self.assertEqual(self.get('../settings.py').status_code, 404)
+        self.assertEqual(self.get('products').status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_proxy_offload_quotes_the_path(self):
+        response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/products/caf%C3%A9%20tray.0123456789ab.txt')
+        self.assertEqual(response.content, b'')
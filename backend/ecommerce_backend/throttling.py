@@ -0,0 +1,184 @@
+import logging
+import time
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Bucket levels are kept in thousandths of a token so fractional refill rates work with integer incr()
+SCALE = 1000
+
+
+def parse_rate(rate):
+    """``'5/min'`` -> 5 / 60 tokens per second."""
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period[0]]
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else None
+
+
+def throttle_cache():
+    cache = caches[settings.THROTTLE_CACHE]
+    if isinstance(cache, LocMemCache) and not settings.DEBUG:
+        warn_per_process()
+    return cache
+
+
+@lru_cache(maxsize=None)
+def warn_per_process():
+    logger.warning(
+        'THROTTLE_CACHE %r is per process: each worker enforces THROTTLE_BUCKETS and '
+        'LOAD_SHEDDING_LIMITS on its own. Configure a shared cache to apply them across workers.',
+        settings.THROTTLE_CACHE,
+    )
+
+
+class TokenBucket:
+    """A token bucket kept in the shared cache using only ``add`` and ``incr``.
+
+    The cache holds the number of (milli)tokens taken since the start of the
+    current epoch; tokens earned since then are derived from the clock, so a
+    request costs a single atomic increment and no lock. When the bucket would
+    hold more than ``capacity`` the count is bumped to cap it. Epochs last
+    ``THROTTLE_EPOCH`` seconds, staggered per key, and the bucket starts full
+    again in each, so at most one extra burst per epoch slips through.
+    """
+
+    def __init__(self, key, capacity, rate):
+        self.key = key
+        self.capacity = capacity * SCALE
+        self.rate = rate * SCALE
+        self.cache = throttle_cache()
+
+    def _counter(self, now):
+        epoch = settings.THROTTLE_EPOCH
+        offset = zlib.crc32(self.key.encode()) % epoch
+        number, elapsed = divmod(now - offset, epoch)
+        return f'throttle:{self.key}:{int(number)}', elapsed
+
+    def _incr(self, key, delta):
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            if self.cache.add(key, delta, settings.THROTTLE_EPOCH + 60):
+                return delta
+            return self.cache.incr(key, delta)
+
+    def consume(self, now=None):
+        """Take one token; return 0 if granted, else the seconds until one is available."""
+        now = time.time() if now is None else now
+        key, elapsed = self._counter(now)
+        earned = int(elapsed * self.rate)
+        taken = self._incr(key, SCALE)
+        if taken - SCALE < earned:
+            # Idle long enough for the bucket to overflow: discard the excess
+            taken = self._incr(key, earned - (taken - SCALE))
+        deficit = taken - self.capacity - earned
+        self.counter = key
+        if deficit <= 0:
+            return 0
+        self.refund()
+        return deficit / self.rate if self.rate else settings.THROTTLE_EPOCH
+
+    def refund(self):
+        self._incr(self.counter, -SCALE)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Apply the ``THROTTLE_BUCKETS`` configured for the request's URL name.
+
+    Each route may have an ``ip`` bucket, a ``user`` bucket (the client IP for
+    anonymous requests) and an ``endpoint`` bucket shared by all clients. A
+    request must get a token from every one; tokens taken before a refusal are
+    given back.
+    """
+
+    def allow_request(self, request, view):
+        self.delay = None
+        name = route_name(request)
+        buckets = settings.THROTTLE_BUCKETS.get(name)
+        if not buckets:
+            return True
+
+        granted = []
+        for scope, (capacity, rate) in buckets.items():
+            bucket = TokenBucket(f'{name}:{self.identity(request, scope)}', capacity, parse_rate(rate))
+            delay = bucket.consume()
+            if delay:
+                for earlier in granted:
+                    earlier.refund()
+                self.delay = delay
+                return False
+            granted.append(bucket)
+        return True
+
+    def identity(self, request, scope):
+        if scope == 'endpoint':
+            return 'all'
+        if scope == 'user' and request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def wait(self):
+        return self.delay
+
+
+class LoadSheddingMiddleware:
+    """Turn requests away with 503 while too many are running on an expensive route.
+
+    ``LOAD_SHEDDING_LIMITS`` maps URL names to the number of requests allowed in
+    flight across all workers sharing the cache. Each request is counted in the
+    cache key of the window it started in, and the current and previous windows
+    are summed, so counts left behind by a killed worker expire on their own.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        release = getattr(request, '_release_slot', None)
+        if release is not None:
+            if response.streaming:
+                # Streamed exports keep working until the last chunk is sent
+                response._resource_closers.append(release)
+            else:
+                release()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = route_name(request)
+        limit = settings.LOAD_SHEDDING_LIMITS.get(name)
+        if not limit:
+            return None
+
+        cache = throttle_cache()
+        window = settings.LOAD_SHEDDING_WINDOW
+        number = int(time.time() // window)
+        key = f'inflight:{name}:{number}'
+        cache.add(key, 0, window * 2 + 60)
+        running = cache.incr(key) + (cache.get(f'inflight:{name}:{number - 1}') or 0)
+        if running > limit:
+            release_slot(cache, key)
+            response = JsonResponse({'detail': 'Server is busy, please retry shortly.'}, status=503)
+            response['Retry-After'] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+            return response
+        request._release_slot = lambda: release_slot(cache, key)
+        return None
+
+
+def release_slot(cache, key):
+    try:
+        cache.decr(key)
+    except ValueError:
+        pass
@@ -0,0 +1,54 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import get_resolver
+from products.changes import listener
+
+from .compression import available_encodings
+from .schema import schema_documents
+
+logger = logging.getLogger(__name__)
+
+
+def warmup_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host and '*' not in host]
+    return hosts[0].lstrip('.') if hosts else 'localhost'
+
+
+def warm_up():
+    """Do the work a worker would otherwise do on its first requests.
+
+    Imports every view through the URL resolver, generates the OpenAPI schema
+    and requests ``WARMUP_PATHS`` so serializers, querysets and the catalog
+    and compression caches are primed. Run in the gunicorn master with
+    ``preload_app`` the results are shared by all workers. Database
+    connections are closed and the catalog change listener stopped afterwards
+    so no worker inherits them; each worker starts its own listener.
+    """
+    timings = {}
+    started = time.perf_counter()
+    get_resolver().url_patterns
+    timings['urls'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for document in schema_documents().values():
+        for encoding in available_encodings():
+            document.content(encoding)
+    timings['schema'] = time.perf_counter() - started
+
+    client = Client(HTTP_HOST=warmup_host(), HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+    for path in settings.WARMUP_PATHS:
+        started = time.perf_counter()
+        try:
+            status = client.get(path).status_code
+        except Exception:
+            logger.exception('Warm-up request to %s failed', path)
+            status = 'error'
+        timings[f'{path} ({status})'] = time.perf_counter() - started
+
+    listener.shutdown()
+    connections.close_all()
+    return timings
@@ -0,0 +1,33 @@
+# gunicorn settings; picked up automatically when gunicorn is started from this
+# directory. Command line flags still take precedence.
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * multiprocessing.cpu_count() + 1, 8)))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+# Import Django and the whole project once in the master; workers share those
+# pages copy-on-write and are ready as soon as they fork
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    if not preload_app or os.environ.get('SKIP_WARMUP'):
+        return
+    from ecommerce_backend.warmup import warm_up
+
+    for step, seconds in warm_up().items():
+        server.log.info('Warm-up %s: %.0f ms', step, seconds * 1000)
+    # Keep the warmed objects out of the collector so it doesn't touch (and copy) their pages in the workers
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from django.db import connections
+
+    connections.close_all()
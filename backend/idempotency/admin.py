@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'response_status', 'created_at', 'expires_at')
+    list_select_related = ('user',)
+    search_fields = ('key', 'user__email')
+    readonly_fields = ('user', 'key', 'request_hash', 'response_status', 'response_body', 'created_at', 'expires_at')
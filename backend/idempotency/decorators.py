@@ -0,0 +1,103 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{payload}'.encode()).hexdigest()
+
+
+def _claim(user, key, fingerprint):
+    """Return ``(record, None)`` when this request should run, ``(None, response)`` otherwise."""
+    for _ in range(3):
+        now = timezone.now()
+        try:
+            # Committed straight away so concurrent duplicates see the lock
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user, key=key, request_hash=fingerprint, locked_at=now,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+                )
+            return record, None
+        except IntegrityError:
+            pass
+
+        existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if existing is None:
+            continue
+        if existing.expires_at <= now:
+            IdempotencyKey.objects.filter(pk=existing.pk, expires_at__lte=now).delete()
+            continue
+        if existing.request_hash != fingerprint:
+            return None, Response(
+                {'error': f'{HEADER} was already used for a different request.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if existing.completed:
+            return None, Response(
+                existing.response_body, status=existing.response_status,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+        # The first request holds the lock; take it over only if that request died
+        stale = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        if existing.locked_at < stale and IdempotencyKey.objects.filter(
+            pk=existing.pk, response_status__isnull=True, locked_at=existing.locked_at
+        ).update(locked_at=now):
+            return existing, None
+        return None, Response(
+            {'error': 'A request with this Idempotency-Key is still being processed.'},
+            status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'}
+        )
+    return None, Response(
+        {'error': f'Could not acquire {HEADER}, please retry.'},
+        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'}
+    )
+
+
+def idempotent(handler):
+    """Honor an ``Idempotency-Key`` header on a view handler.
+
+    The first request with a key runs normally and its response is stored; a
+    retry with the same key and payload gets the stored response back without
+    running the handler again. Errors raised by the handler and 5xx responses
+    release the key so the client can retry.
+    """
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > 255:
+            return Response(
+                {'error': f'{HEADER} must be between 1 and 255 characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        record, response = _claim(request.user, key, request_fingerprint(request))
+        if response is not None:
+            return response
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                response_status=response.status_code, response_body=response.data
+            )
+        return response
+    return wrapper
@@ -1,24 +1,122 @@
-from django.contrib import admin
-from .models import Order, OrderItem
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.core.cache import cache
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .models import Order, OrderItem, OrderStatusHistory
+from .reports import sales_summary
+from .status import InvalidTransition, transition_orders
+from .tasks import send_order_status_updates
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
     readonly_fields = ('total_price',)
+    raw_id_fields = ('product',)
+    
+    @admin.display(description='Total price')
+    def total_price(self, obj):
+        # The blank "add another" row has no price or quantity yet
+        return obj.total_price if obj.pk else None
+
+class OrderStatusHistoryInline(admin.TabularInline):
+    model = OrderStatusHistory
+    extra = 0
+    can_delete = False
+    readonly_fields = ('from_status', 'to_status', 'changed_by', 'created_at')
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('order_number', 'user', 'status', 'total_amount', 'created_at')
+    list_display = ('order_number', 'user', 'status', 'total_amount', 'item_count', 'created_at')
     list_filter = ('status', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('order_number', 'user__email')
     list_editable = ('status',)
     ordering = ('-created_at',)
-    inlines = [OrderItemInline]
+    date_hierarchy = 'created_at'
+    show_full_result_count = False
+    inlines = [OrderItemInline, OrderStatusHistoryInline]
+    actions = ['mark_processing', 'mark_shipped', 'mark_delivered', 'mark_cancelled']
+    change_list_template = 'admin/orders/order/change_list.html'
+    
+    readonly_fields = ('order_number', 'item_count', 'created_at')
+    
+    def save_model(self, request, obj, form, change):
+        previous = getattr(obj, '_loaded_status', None)
+        super().save_model(request, obj, form, change)
+        if change and previous and previous != obj.status:
+            OrderStatusHistory.objects.create(
+                order=obj, from_status=previous, to_status=obj.status, changed_by=request.user
+            )
+            send_order_status_updates.enqueue([obj.pk])
+    
+    def transition(self, request, queryset, to_status):
+        try:
+            updated = transition_orders(
+                to_status, ids=list(queryset.values_list('pk', flat=True)), changed_by=request.user
+            )
+        except InvalidTransition as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+        skipped = queryset.count() - len(updated)
+        self.message_user(request, f"{len(updated)} order(s) marked as {to_status}, {skipped} skipped.")
+    
+    @admin.action(description='Mark selected orders as processing')
+    def mark_processing(self, request, queryset):
+        self.transition(request, queryset, 'processing')
+    
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_shipped(self, request, queryset):
+        self.transition(request, queryset, 'shipped')
+    
+    @admin.action(description='Mark selected orders as delivered')
+    def mark_delivered(self, request, queryset):
+        self.transition(request, queryset, 'delivered')
+    
+    @admin.action(description='Mark selected orders as cancelled')
+    def mark_cancelled(self, request, queryset):
+        self.transition(request, queryset, 'cancelled')
+    
+    def get_urls(self):
+        return [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view), name='orders_order_dashboard'),
+        ] + super().get_urls()
     
-    readonly_fields = ('order_number', 'created_at')
+    def dashboard_view(self, request):
+        try:
+            days = min(max(int(request.GET.get('days', 30)), 1), 366)
+        except ValueError:
+            days = 30
+        end = timezone.now()
+        start = end - timedelta(days=days)
+        cache_key = f'orders:dashboard:{days}'
+        summary = cache.get(cache_key)
+        if summary is None:
+            summary = sales_summary(start, end)
+            cache.set(cache_key, summary, 60)
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Sales dashboard',
+            'days': days,
+            'day_choices': [7, 30, 90, 365],
+            'summary': summary,
+            'total_revenue': sum(row['revenue'] or 0 for row in summary['by_day']),
+            'total_orders': sum(row['orders'] for row in summary['by_day']),
+        }
+        return TemplateResponse(request, 'admin/orders/order/dashboard.html', context)
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ('order', 'product', 'quantity', 'price', 'total_price')
+    list_display = ('order', 'product_name', 'quantity', 'price', 'total_price')
     list_filter = ('order__created_at',)
-    search_fields = ('order__order_number', 'product__name')
+    list_select_related = ('order',)
+    search_fields = ('order__order_number', 'product_name')
+    raw_id_fields = ('order', 'product')
+    show_full_result_count = False
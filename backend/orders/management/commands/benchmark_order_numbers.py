@@ -0,0 +1,59 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders.models import Order
+from orders.numbers import new_order_number
+
+User = get_user_model()
+
+
+def uuid_order_number():
+    return str(uuid.uuid4()).replace('-', '').upper()[:10]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare order number schemes by generation rate and order insert throughput'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=5000, help='Orders inserted per scheme (rolled back)')
+        parser.add_argument('--generate', type=int, default=200000, help='Numbers generated per scheme')
+    
+    def handle(self, *args, **options):
+        user = User.objects.order_by('pk').first()
+        if user is None:
+            self.stderr.write('At least one user is needed to insert orders.')
+            return
+        
+        for label, generate in (('uuid4[:10]', uuid_order_number), ('time-ordered', new_order_number)):
+            started = time.perf_counter()
+            numbers = [generate() for _ in range(options['generate'])]
+            elapsed = time.perf_counter() - started
+            in_order = sum(a < b for a, b in zip(numbers, numbers[1:]))
+            self.stdout.write(
+                f"{label:<13} generate {len(numbers) / elapsed:>10.0f}/s  "
+                f"duplicates {len(numbers) - len(set(numbers))}  "
+                f"increasing {in_order / max(len(numbers) - 1, 1):.1%}"
+            )
+            self.stdout.write(f"{label:<13} insert   {self.insert_rate(user, generate, options['orders']):>10.0f} orders/s")
+    
+    def insert_rate(self, user, generate, count):
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for _ in range(count):
+                    Order.objects.create(
+                        user=user, order_number=generate(), total_amount=0,
+                        shipping_address='benchmark', phone='0'
+                    )
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        return count / elapsed
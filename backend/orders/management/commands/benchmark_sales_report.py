@@ -0,0 +1,34 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.reports import sales_summary
+from orders.rollups import day_bounds, rollup_summary
+
+class Command(BaseCommand):
+    help = 'Compare the sales report computed from orders against the rollup tables'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    def handle(self, *args, **options):
+        end_day = timezone.localdate() + timedelta(days=1)
+        start_day = end_day - timedelta(days=options['days'])
+        start, _ = day_bounds(start_day)
+        end, _ = day_bounds(end_day)
+        
+        for label, run in (
+            ('on-the-fly aggregation', lambda: sales_summary(start, end)),
+            ('rollup tables', lambda: rollup_summary(start_day, end_day)),
+        ):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f"{label:<24} best {min(timings) * 1000:8.1f} ms  "
+                f"mean {sum(timings) / len(timings) * 1000:8.1f} ms over {options['days']} days"
+            )
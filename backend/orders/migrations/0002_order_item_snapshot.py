@@ -0,0 +1,67 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_snapshots(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = OrderItem.objects.select_related('product__category').filter(product__isnull=False)
+    batch = []
+    for item in items.iterator(chunk_size=1000):
+        item.product_name = item.product.name
+        item.product_image = item.product.image.name if item.product.image else ''
+        item.category_name = item.product.category.name
+        batch.append(item)
+        if len(batch) >= 1000:
+            OrderItem.objects.bulk_update(batch, ['product_name', 'product_image', 'category_name'])
+            batch = []
+    OrderItem.objects.bulk_update(batch, ['product_name', 'product_image', 'category_name'])
+    Order.objects.update(
+        item_count=Coalesce(
+            models.Subquery(
+                OrderItem.objects.filter(order=models.OuterRef('pk'))
+                .order_by().values('order').annotate(count=models.Count('id')).values('count')
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_image_renditions'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='category_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='products.product'),
+        ),
+        migrations.RunPython(backfill_order_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from products.models import Product
+from .numbers import new_order_number
 
 User = get_user_model()
 
@@ -12,6 +15,14 @@ class Order(models.Model):
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
     ]
+    # Allowed next statuses; delivered and cancelled are final
+    TRANSITIONS = {
+        'pending': ['processing', 'cancelled'],
+        'processing': ['shipped', 'cancelled'],
+        'shipped': ['delivered'],
+        'delivered': [],
+        'cancelled': [],
+    }
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     order_number = models.CharField(max_length=100, unique=True)
@@ -19,30 +30,139 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     shipping_address = models.TextField()
     phone = models.CharField(max_length=15)
+    item_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_at_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_number}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    @classmethod
+    def sources_for(cls, status):
+        """Statuses an order can move to ``status`` from."""
+        return [source for source, targets in cls.TRANSITIONS.items() if status in targets]
+    
+    def can_transition_to(self, status):
+        return status in self.TRANSITIONS.get(self.status, [])
+    
+    def clean(self):
+        previous = getattr(self, '_loaded_status', None)
+        if previous and previous != self.status and self.status not in self.TRANSITIONS.get(previous, []):
+            raise ValidationError({
+                'status': f"Cannot change status from '{previous}' to '{self.status}'."
+            })
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
-            import uuid
-            self.order_number = str(uuid.uuid4()).replace('-', '').upper()[:10]
+            self.order_number = new_order_number()
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)  # Price at time of order
+    # Product details at time of order, so order reads never touch the catalog
+    product_name = models.CharField(max_length=200, blank=True)
+    product_image = models.CharField(max_length=255, blank=True)
+    category_name = models.CharField(max_length=100, blank=True)
     
     def __str__(self):
-        return f"{self.product.name} x {self.quantity}"
+        return f"{self.product_name} x {self.quantity}"
+    
+    @classmethod
+    def from_product(cls, order, product, quantity):
+        return cls(
+            order=order,
+            product=product,
+            quantity=quantity,
+            price=product.price,
+            product_name=product.name,
+            product_image=product.image.name if product.image else '',
+            category_name=product.category.name,
+        )
     
     @property
     def total_price(self):
         return self.price * self.quantity
+
+class OrderStatusHistory(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
+    from_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name_plural = "Order status history"
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_status_history_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.order_id}: {self.from_status} -> {self.to_status}"
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product_id = models.BigIntegerField(null=True)
+    product_name = models.CharField(max_length=200, blank=True)
+    category_name = models.CharField(max_length=100, blank=True)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = "Daily product sales"
+        indexes = [
+            models.Index(fields=['day', 'product_id'], name='daily_product_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} - {self.product_name}"
+
+class DailyCategorySales(models.Model):
+    day = models.DateField()
+    category_name = models.CharField(max_length=100, blank=True)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = "Daily category sales"
+        unique_together = ('day', 'category_name')
+    
+    def __str__(self):
+        return f"{self.day} - {self.category_name}"
+
+class DailyOrderStatus(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = "Daily order status counts"
+        unique_together = ('day', 'status')
+    
+    def __str__(self):
+        return f"{self.day} - {self.status}"
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
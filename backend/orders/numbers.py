@@ -0,0 +1,54 @@
+import os
+import secrets
+import threading
+import time
+
+# Crockford base32: no I, L, O or U, so numbers are easy to read out over the phone
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+RANDOM_BITS = 80
+LENGTH = 26
+
+
+def encode(value, length=LENGTH):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class OrderNumberGenerator:
+    """ULID-style order numbers: 48 bits of milliseconds then 80 random bits.
+
+    Numbers sort by creation time, so inserts land at the right edge of the
+    unique index instead of at random pages. Within one millisecond the random
+    part is incremented rather than redrawn, keeping numbers from a process
+    strictly increasing; across processes and hosts uniqueness rests on the 80
+    random bits. State is reset after fork so preloaded gunicorn workers never
+    continue from the same sequence.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.last_ms = -1
+        self.last_random = 0
+
+    def __call__(self):
+        with self.lock:
+            pid = os.getpid()
+            now_ms = time.time_ns() // 1_000_000
+            if pid != self.pid or now_ms > self.last_ms:
+                self.pid = pid
+                self.last_ms = max(now_ms, self.last_ms)
+                self.last_random = secrets.randbits(RANDOM_BITS)
+            else:
+                # Same millisecond, or the clock stepped back: keep counting from the last number
+                self.last_random += 1
+                if self.last_random >> RANDOM_BITS:
+                    self.last_ms += 1
+                    self.last_random = secrets.randbits(RANDOM_BITS)
+            return encode(self.last_ms << RANDOM_BITS | self.last_random)
+
+
+new_order_number = OrderNumberGenerator()
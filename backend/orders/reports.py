@@ -0,0 +1,43 @@
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from .models import Order, OrderItem
+
+LINE_TOTAL = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def sales_summary(start, end, top=10):
+    """Revenue and order aggregates for orders created in ``[start, end)``.
+
+    Each section is a single grouped query over the created_at index; category
+    and product figures come from the order item snapshots, so the catalog
+    tables are never joined. Cancelled orders are left out of revenue.
+    """
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    items = OrderItem.objects.filter(
+        order__created_at__gte=start, order__created_at__lt=end
+    ).exclude(order__status='cancelled').order_by()
+    
+    return {
+        'by_day': list(
+            orders.exclude(status='cancelled')
+            .annotate(day=TruncDate('created_at'))
+            .values('day')
+            .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+            .order_by('day')
+        ),
+        'by_status': list(
+            orders.values('status')
+            .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+            .order_by('status')
+        ),
+        'by_category': list(
+            items.values('category_name')
+            .annotate(units=Sum('quantity'), revenue=Sum(LINE_TOTAL))
+            .order_by('-revenue')
+        ),
+        'top_products': list(
+            items.values('product_id', 'product_name')
+            .annotate(units=Sum('quantity'), revenue=Sum(LINE_TOTAL))
+            .order_by('-revenue')[:top]
+        ),
+    }
@@ -1,19 +1,40 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from ecommerce_backend.serialization import DynamicFieldsMixin, ValuesRepresentationMixin
+from cart.reservations import InsufficientStock, convert_holds
 from .models import Order, OrderItem
-from products.serializers import ProductListSerializer
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductListSerializer(read_only=True)
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    product = serializers.SerializerMethodField()
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'quantity', 'price', 'total_price']
+    
+    def get_product(self, obj):
+        # Built from the checkout snapshot; the product may have changed or gone since
+        image = None
+        if obj.product_image:
+            image = default_storage.url(obj.product_image)
+            request = self.context.get('request')
+            if request is not None:
+                image = request.build_absolute_uri(image)
+        return {
+            'id': obj.product_id,
+            'name': obj.product_name,
+            'image': image,
+            'category_name': obj.category_name,
+        }
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     
+    select_related_fields = {'user_name': ['user']}
+    prefetch_related_fields = {'items': ['items']}
+    
     class Meta:
         model = Order
         fields = ['id', 'order_number', 'user', 'user_name', 'total_amount', 'status', 
@@ -31,42 +52,61 @@ class CreateOrderSerializer(serializers.ModelSerializer):
         # Get user's cart
         try:
             cart = user.cart
-            if not cart.items.exists():
-                raise serializers.ValidationError("Cart is empty.")
-        except:
+        except ObjectDoesNotExist:
             raise serializers.ValidationError("Cart not found.")
         
-        # Calculate total amount
-        total_amount = cart.total_price
+        cart_items = list(cart.items.select_related('product__category'))
+        if not cart_items:
+            raise serializers.ValidationError("Cart is empty.")
+        
+        # Take the items out of stock, consuming this cart's holds
+        try:
+            convert_holds(cart, {item.product_id: item.quantity for item in cart_items})
+        except InsufficientStock as exc:
+            raise serializers.ValidationError(str(exc))
         
         # Create order
         order = Order.objects.create(
             user=user,
-            total_amount=total_amount,
+            total_amount=sum(item.total_price for item in cart_items),
             shipping_address=validated_data['shipping_address'],
-            phone=validated_data['phone']
+            phone=validated_data['phone'],
+            item_count=len(cart_items)
         )
         
-        # Create order items from cart items
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
+        # Create order items from cart items, snapshotting the products
+        OrderItem.objects.bulk_create([
+            OrderItem.from_product(order, cart_item.product, cart_item.quantity)
+            for cart_item in cart_items
+        ])
         
         # Clear cart after order creation
         cart.items.all().delete()
         
         return order
 
-class OrderListSerializer(serializers.ModelSerializer):
-    item_count = serializers.SerializerMethodField()
+class OrderListSerializer(DynamicFieldsMixin, ValuesRepresentationMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'items': lambda: OrderItemSerializer(many=True, read_only=True),
+    }
+    prefetch_related_fields = {'items': ['items']}
+    values_map = {
+        'id': 'id', 'order_number': 'order_number', 'total_amount': 'total_amount',
+        'status': 'status', 'item_count': 'item_count', 'created_at': 'created_at',
+    }
     
     class Meta:
         model = Order
         fields = ['id', 'order_number', 'total_amount', 'status', 'item_count', 'created_at']
+
+class BulkStatusTransitionSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=5000
+    )
+    from_status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
     
-    def get_item_count(self, obj):
-        return obj.items.count()
+    def validate(self, attrs):
+        if 'ids' not in attrs and 'from_status' not in attrs:
+            raise serializers.ValidationError("Provide ids, from_status or both.")
+        return attrs
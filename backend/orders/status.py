@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, OrderStatusHistory
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def transition_orders(to_status, ids=None, from_status=None, changed_by=None):
+    """Move every eligible order to ``to_status`` with one conditional UPDATE.
+
+    Orders are selected by ``ids``, ``from_status`` or both; only those whose
+    current status may move to ``to_status`` are changed. Returns the ids that
+    were updated, after writing one history row per order.
+    """
+    sources = Order.sources_for(to_status)
+    if from_status is not None:
+        if from_status not in sources:
+            raise InvalidTransition(f"Cannot change status from '{from_status}' to '{to_status}'.")
+        sources = [from_status]
+    if not sources:
+        raise InvalidTransition(f"No order can be moved to '{to_status}'.")
+
+    eligible = Order.objects.filter(status__in=sources).order_by()
+    if ids is not None:
+        eligible = eligible.filter(pk__in=ids)
+    now = timezone.now()
+    with transaction.atomic():
+        # Row locks keep the previous statuses read here accurate for the history
+        previous = dict(eligible.select_for_update().values_list('pk', 'status'))
+        if not previous:
+            return []
+        # queryset.update() skips auto_now, and the sales rollups rely on updated_at
+        Order.objects.filter(pk__in=previous, status__in=sources).update(status=to_status, updated_at=now)
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(
+                order_id=pk, from_status=status, to_status=to_status, changed_by=changed_by, created_at=now
+            )
+            for pk, status in previous.items()
+        ], batch_size=1000)
+        from .tasks import send_order_status_updates
+        send_order_status_updates.enqueue(sorted(previous))
+    return sorted(previous)
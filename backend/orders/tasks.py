@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from taskqueue.registry import task
+from .models import Order
+
+
+@task
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').get(pk=order_id)
+    lines = [
+        f"{item.quantity} x {item.product_name} @ {item.price}"
+        for item in order.items.all()
+    ]
+    send_mail(
+        f"Order {order.order_number} received",
+        "Thank you for your order.\n\n" + "\n".join(lines) + f"\n\nTotal: {order.total_amount}",
+        settings.DEFAULT_FROM_EMAIL,
+        [order.user.email],
+    )
+
+
+@task
+def send_order_status_updates(order_ids):
+    """Notify the owners of many orders over a single mail connection."""
+    connection = get_connection()
+    messages = [
+        EmailMessage(
+            f"Order {order.order_number} is {order.get_status_display().lower()}",
+            f"The status of your order {order.order_number} is now: {order.get_status_display()}.",
+            settings.DEFAULT_FROM_EMAIL,
+            [order.user.email],
+            connection=connection,
+        )
+        for order in Order.objects.filter(pk__in=order_ids).select_related('user').iterator()
+    ]
+    connection.send_messages(messages)
@@ -1,3 +1,120 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import User
+from products.models import Category, Product
+from .models import Order
+
+
+def make_user(number, **extra):
+    return User.objects.create_user(
+        email=f'user{number}@example.com', username=f'user{number}', password='secret',
+        first_name='User', last_name=str(number), **extra
+    )
+
+
+class CheckoutTestCase(TestCase):
+    """A shopper with a product in their cart."""
+
+    def setUp(self):
+        category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price='999.00', stock_quantity=5, category=category
+        )
+        self.user = make_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/cart/add/', {'product_id': self.product.pk, 'quantity': 2})
+        self.assertEqual(response.status_code, 201)
+
+    def checkout(self, key=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                '/api/orders/create/', {'shipping_address': '1 Main St', 'phone': '555-0100'}, headers=headers
+            )
+
+
+class OrderHistoryTests(CheckoutTestCase):
+
+    def test_orders_keep_what_was_bought(self):
+        order = self.checkout().json()['order']
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 3)
+
+        self.product.name = 'Notebook 2'
+        self.product.save()
+        self.product.delete()
+        with self.assertNumQueries(2):
+            orders = self.client.get('/api/orders/').json()['results']
+        self.assertEqual([(row['id'], row['item_count']) for row in orders], [(order['id'], 1)])
+
+        item = self.client.get(f'/api/orders/{order["id"]}/').json()['items'][0]
+        self.assertEqual(item['product'], {'id': None, 'name': 'Notebook', 'image': None, 'category_name': 'Laptops'})
+        self.assertEqual((item['quantity'], item['price']), (2, '999.00'))
+
+
+class IdempotentCheckoutTests(CheckoutTestCase):
+
+    def test_retry_replays_the_first_response(self):
+        first = self.checkout('checkout-1')
+        self.assertEqual(first.status_code, 201)
+        retry = self.checkout('checkout-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json()['order']['id'], first.json()['order']['id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.checkout('checkout-1')
+        response = self.client.post(
+            '/api/orders/create/', {'shipping_address': '2 Side St', 'phone': '555-0100'},
+            headers={'Idempotency-Key': 'checkout-1'}
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_rejected_checkout_releases_the_key(self):
+        self.client.delete('/api/cart/clear/')
+        self.assertEqual(self.checkout('checkout-1').status_code, 400)
+        self.client.post('/api/cart/add/', {'product_id': self.product.pk, 'quantity': 1})
+        self.assertEqual(self.checkout('checkout-1').status_code, 201)
+
+
+class OrderStatusTests(CheckoutTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.orders = [self.checkout().json()['order']['id']]
+        self.client.post('/api/cart/add/', {'product_id': self.product.pk, 'quantity': 1})
+        self.orders.append(self.checkout().json()['order']['id'])
+        self.client.force_authenticate(make_user(2, is_staff=True))
+
+    def set_status(self, pk, new_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(f'/api/orders/{pk}/status/', {'status': new_status})
+
+    def test_transitions_follow_the_state_machine(self):
+        response = self.set_status(self.orders[0], 'delivered')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['allowed'], ['processing', 'cancelled'])
+        self.assertEqual(self.set_status(self.orders[0], 'processing').status_code, 200)
+        order = Order.objects.get(pk=self.orders[0])
+        self.assertEqual(order.status, 'processing')
+        self.assertEqual(
+            list(order.status_history.values_list('from_status', 'to_status')), [('pending', 'processing')]
+        )
+
+    def test_bulk_transition_skips_ineligible_orders(self):
+        self.set_status(self.orders[0], 'cancelled')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/orders/status/bulk/', {'status': 'processing', 'ids': self.orders}, format='json'
+            )
+        self.assertEqual(response.json(), {
+            'status': 'processing', 'updated': [self.orders[1]], 'skipped': [self.orders[0]]
+        })
+        response = self.client.post(
+            '/api/orders/status/bulk/', {'status': 'shipped', 'from_status': 'pending'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
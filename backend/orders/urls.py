@@ -5,5 +5,7 @@ urlpatterns = [
     path('', views.OrderListView.as_view(), name='order-list'),
     path('<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('create/', views.CreateOrderView.as_view(), name='create-order'),
+    path('status/bulk/', views.OrderBulkStatusView.as_view(), name='bulk-update-order-status'),
+    path('reports/sales/', views.SalesReportView.as_view(), name='sales-report'),
     path('<int:pk>/status/', views.OrderStatusUpdateView.as_view(), name='update-order-status'),
 ]
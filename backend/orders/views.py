@@ -1,32 +1,50 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from datetime import timedelta
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+from ecommerce_backend.serialization import FieldSelectionMixin, ValuesListMixin
+from idempotency.decorators import idempotent
 from .models import Order
-from .serializers import OrderSerializer, CreateOrderSerializer, OrderListSerializer
+from .serializers import (
+    OrderSerializer, CreateOrderSerializer, OrderListSerializer, BulkStatusTransitionSerializer
+)
+from .rollups import rollup_summary
+from .status import InvalidTransition, transition_orders
+from .tasks import send_order_confirmation
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(ValuesListMixin, FieldSelectionMixin, generics.ListAPIView):
+    queryset = Order.objects.all()
     serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(FieldSelectionMixin, generics.RetrieveAPIView):
+    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
 class CreateOrderView(generics.CreateAPIView):
     serializer_class = CreateOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        order = serializer.save()
+        with transaction.atomic():
+            order = serializer.save()
+            send_order_confirmation.enqueue(order.id)
         
         return Response({
             'message': 'Order created successfully',
@@ -46,10 +64,96 @@ class OrderStatusUpdateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        order.status = new_status
-        order.save()
+        if order.status != new_status:
+            if not order.can_transition_to(new_status):
+                return Response(
+                    {
+                        'error': f"Cannot change status from '{order.status}' to '{new_status}'",
+                        'allowed': Order.TRANSITIONS[order.status]
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not transition_orders(new_status, ids=[order.pk], from_status=order.status, changed_by=request.user):
+                return Response(
+                    {'error': 'Order status was changed by another request'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            order.status = new_status
         
         return Response({
             'message': 'Order status updated successfully',
-            'order': OrderSerializer(order).data
+            'order': OrderListSerializer(order).data
+        })
+
+@extend_schema(
+    summary="Bulk change order status",
+    description="Move the listed orders, or every order in from_status, to a new status (admin only). "
+                "Orders whose current status can't move to it are skipped.",
+    tags=['Orders'],
+    request=BulkStatusTransitionSerializer,
+    responses={
+        200: OpenApiResponse(description="The new status, ids of updated orders and, for ids, the skipped ones"),
+        400: OpenApiResponse(description="Bad request or transition not allowed from from_status"),
+        403: OpenApiResponse(description="Admin access required")
+    }
+)
+class OrderBulkStatusView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def post(self, request):
+        serializer = BulkStatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        try:
+            updated = transition_orders(
+                data['status'], ids=data.get('ids'), from_status=data.get('from_status'),
+                changed_by=request.user
+            )
+        except InvalidTransition as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = {'status': data['status'], 'updated': updated}
+        if 'ids' in data:
+            updated_ids = set(updated)
+            result['skipped'] = [pk for pk in data['ids'] if pk not in updated_ids]
+        return Response(result)
+
+@extend_schema(
+    summary="Sales report",
+    description="Orders, revenue, category and product totals per day from the sales rollups (admin only).",
+    tags=['Orders'],
+    parameters=[
+        OpenApiParameter(name='start', description='First day (YYYY-MM-DD), default 30 days ago', required=False, type=OpenApiTypes.DATE),
+        OpenApiParameter(name='end', description='Last day (YYYY-MM-DD), default today', required=False, type=OpenApiTypes.DATE),
+    ],
+    responses={
+        200: OpenApiResponse(description="start, end, refreshed_through, by_day, by_status, by_category, top_products"),
+        400: OpenApiResponse(description="Invalid date range"),
+        403: OpenApiResponse(description="Admin access required")
+    }
+)
+class SalesReportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        end = timezone.localdate() + timedelta(days=1)
+        start = end - timedelta(days=30)
+        try:
+            if request.query_params.get('start'):
+                start = parse_date(request.query_params['start'])
+            if request.query_params.get('end'):
+                end = parse_date(request.query_params['end']) + timedelta(days=1)
+        except (TypeError, ValueError):
+            start = end = None
+        if start is None or end is None or start >= end:
+            return Response(
+                {'error': 'start and end must be YYYY-MM-DD dates with start <= end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'start': start,
+            'end': end - timedelta(days=1),
+            **rollup_summary(start, end)
         })
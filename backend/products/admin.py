@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Product, ProductImage, Review
+from django.db import transaction
+from .models import Category, Product, ProductImage, Review, ProductRatingStats
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -15,6 +16,7 @@ class ProductImageInline(admin.TabularInline):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'stock_quantity', 'is_active', 'created_at')
     list_filter = ('category', 'is_active', 'created_at')
+    list_select_related = ('category',)
     search_fields = ('name', 'description')
     list_editable = ('is_active', 'stock_quantity')
     ordering = ('-created_at',)
@@ -23,6 +25,38 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('product', 'user', 'rating', 'created_at')
+    list_select_related = ('product', 'user')
     list_filter = ('rating', 'created_at')
     search_fields = ('product__name', 'user__email')
     ordering = ('-created_at',)
+    
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        previous = None
+        if change:
+            previous = Review.objects.select_for_update().values_list('product_id', 'rating').get(pk=obj.pk)
+        super().save_model(request, obj, form, change)
+        if previous is None:
+            ProductRatingStats.record(obj.product_id, added=obj.rating)
+        elif previous[0] == obj.product_id:
+            ProductRatingStats.record(obj.product_id, added=obj.rating, removed=previous[1])
+        else:
+            ProductRatingStats.record(previous[0], removed=previous[1])
+            ProductRatingStats.record(obj.product_id, added=obj.rating)
+    
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Review.objects.filter(pk=obj.pk))
+    
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for product_id, rating in queryset.select_for_update().values_list('product_id', 'rating'):
+            ProductRatingStats.record(product_id, removed=rating)
+        super().delete_queryset(request, queryset)
+
+@admin.register(ProductRatingStats)
+class ProductRatingStatsAdmin(admin.ModelAdmin):
+    list_display = ('product', 'review_count', 'average_rating', 'updated_at')
+    list_select_related = ('product',)
+    search_fields = ('product__name',)
+    readonly_fields = [field.name for field in ProductRatingStats._meta.fields]
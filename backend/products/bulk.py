@@ -0,0 +1,276 @@
+import codecs
+import csv
+import json
+import time
+from decimal import Decimal
+
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import invalidate_catalog
+from .models import Category, Product
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_FIELDS = ['sku', 'name', 'description', 'price', 'category', 'stock_quantity', 'is_active']
+UPDATE_FIELDS = ['name', 'description', 'price', 'category', 'stock_quantity', 'is_active', 'updated_at']
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    sku = serializers.CharField(max_length=64, required=False, allow_blank=True, allow_null=True)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    category = serializers.CharField(max_length=100)
+    stock_quantity = serializers.IntegerField(min_value=0, default=0)
+    is_active = serializers.BooleanField(default=True)
+
+
+def guess_format(filename, default='csv'):
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return default
+
+
+def decode_lines(fileobj):
+    """Lazily decode a binary line iterator (e.g. an UploadedFile) to text."""
+    return codecs.iterdecode(fileobj, 'utf-8-sig')
+
+
+def parse_rows(lines, fmt):
+    """Yield ``(row_number, data)`` pairs from text lines without reading them all."""
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            # Empty cells fall back to the serializer defaults
+            yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+    elif fmt == 'ndjson':
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                data = exc
+            yield number, data
+    else:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of: {', '.join(IMPORT_FORMATS)}")
+
+
+class ProductImporter:
+    """Validate and upsert product rows in fixed-size batches.
+
+    Rows carrying a SKU are upserted on it; rows without one are matched to an
+    existing SKU-less product by name. Memory use is bounded by the batch size
+    and ``max_errors`` regardless of the input length.
+    """
+
+    def __init__(self, batch_size=1000, max_errors=1000):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        # One serializer reused for every row avoids re-copying its fields per row
+        self.validator = ProductImportRowSerializer()
+
+    def run(self, rows):
+        started = time.monotonic()
+        batch = []
+        for number, data in rows:
+            self.rows += 1
+            if isinstance(data, ValueError):
+                self.add_error(number, {'non_field_errors': [f'Invalid JSON: {data}']})
+                continue
+            if not isinstance(data, dict):
+                self.add_error(number, {'non_field_errors': ['Row is not a JSON object.']})
+                continue
+            try:
+                validated_data = self.validator.run_validation(data)
+            except serializers.ValidationError as exc:
+                self.add_error(number, exc.detail)
+                continue
+            batch.append((number, validated_data))
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                batch = []
+        if batch:
+            self.write_batch(batch)
+        invalidate_catalog()
+        return self.report(time.monotonic() - started)
+
+    def add_error(self, number, errors):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def report(self, elapsed):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.rows / elapsed) if elapsed else self.rows,
+        }
+
+    def resolve_categories(self, names):
+        categories = dict(Category.objects.filter(name__in=names).values_list('name', 'id'))
+        missing = names - categories.keys()
+        if missing:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        return categories
+
+    @transaction.atomic
+    def write_batch(self, batch):
+        now = timezone.now()
+        categories = self.resolve_categories({data['category'] for _, data in batch})
+        # Later rows win when a key repeats inside one batch
+        by_sku, by_name = {}, {}
+        for _, data in batch:
+            product = Product(
+                sku=data.get('sku') or None,
+                name=data['name'],
+                description=data['description'],
+                price=data['price'],
+                category_id=categories[data['category']],
+                stock_quantity=data['stock_quantity'],
+                is_active=data['is_active'],
+                updated_at=now,
+            )
+            if product.sku:
+                by_sku[product.sku] = product
+            else:
+                by_name[product.name] = product
+
+        if by_sku:
+            existing = set(Product.objects.filter(sku__in=by_sku).values_list('sku', flat=True))
+            Product.objects.bulk_create(
+                by_sku.values(),
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=UPDATE_FIELDS,
+            )
+            self.updated += len(existing)
+            self.created += len(by_sku) - len(existing)
+
+        if by_name:
+            existing = dict(
+                Product.objects.filter(name__in=by_name, sku__isnull=True).values_list('name', 'id')
+            )
+            matched = [product for name, product in by_name.items() if name in existing]
+            for product in matched:
+                product.pk = existing[product.name]
+            # Upserting on the primary key is much cheaper than bulk_update's CASE statements
+            Product.objects.bulk_create(
+                matched,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=UPDATE_FIELDS,
+            )
+            Product.objects.bulk_create([product for product in by_name.values() if product.pk is None])
+            self.updated += len(matched)
+            self.created += len(by_name) - len(matched)
+
+
+class InventoryUpdateError(Exception):
+    pass
+
+
+def max_price():
+    """The largest price ``Product.price`` can store (99999999.99)."""
+    field = Product._meta.get_field('price')
+    return Decimal(10) ** (field.max_digits - field.decimal_places) - Decimal(1).scaleb(-field.decimal_places)
+
+
+def _case(items, absolute, delta, field):
+    whens = []
+    for item in items:
+        if absolute in item:
+            whens.append(When(pk=item['id'], then=Value(item[absolute])))
+        elif delta in item:
+            whens.append(When(pk=item['id'], then=F(field) + item[delta]))
+    if whens:
+        return Case(*whens, default=F(field), output_field=Product._meta.get_field(field))
+
+
+def apply_inventory_updates(items, chunk_size=500):
+    """Apply absolute or relative stock/price changes in one transaction.
+
+    Each chunk of products is written with a single ``UPDATE ... CASE`` statement;
+    relative changes use F() so concurrent syncs don't lose updates. Returns the
+    ids that were updated and those that don't exist.
+    """
+    ids = [item['id'] for item in items]
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            existing = set(Product.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            for start in range(0, len(items), chunk_size):
+                chunk = [item for item in items[start:start + chunk_size] if item['id'] in existing]
+                changes = {
+                    'stock_quantity': _case(chunk, 'stock_quantity', 'stock_delta', 'stock_quantity'),
+                    'price': _case(chunk, 'price', 'price_delta', 'price'),
+                }
+                changes = {field: value for field, value in changes.items() if value is not None}
+                if changes:
+                    Product.objects.filter(pk__in=[item['id'] for item in chunk]).update(
+                        updated_at=now, **changes
+                    )
+            # SQLite stores a price past the field's digits as is (and it then breaks every read)
+            invalid = list(
+                Product.objects.filter(Q(price__lt=0) | Q(price__gt=max_price()), pk__in=existing)
+                .values_list('pk', flat=True)
+            )
+            if invalid:
+                raise InventoryUpdateError(
+                    f"Price would become negative or exceed {max_price()} for products: {invalid}"
+                )
+    except IntegrityError:
+        raise InventoryUpdateError("Stock would become negative for at least one product.")
+    except DataError:
+        # PostgreSQL refuses a price or stock value out of its column's range
+        raise InventoryUpdateError("Price or stock would exceed its maximum for at least one product.")
+    transaction.on_commit(invalidate_catalog)
+    return {
+        'updated': [pk for pk in ids if pk in existing],
+        'not_found': [pk for pk in ids if pk not in existing],
+    }
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """Yield product dicts with a server-side cursor, in constant memory."""
+    if queryset is None:
+        queryset = Product.objects.all()
+    values = queryset.order_by('pk').values_list(
+        'sku', 'name', 'description', 'price', 'category__name', 'stock_quantity', 'is_active'
+    )
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_FIELDS, row))
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] if row[field] is not None else '' for field in EXPORT_FIELDS])
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + '\n'
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
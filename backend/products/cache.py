@@ -0,0 +1,61 @@
+import time
+from functools import partial
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .changes import CATALOG, listener, publish, subscribe
+from .models import Category, Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_version():
+    """Current generation of the catalog; part of every catalog cache key."""
+    if isinstance(caches['default'], LocMemCache):
+        # Other processes' invalidations only reach this copy through the listener
+        listener.ensure_started()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never revives stale keys
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def catalog_cache_key(*parts):
+    return ':'.join(['catalog', str(catalog_version()), *(str(part) for part in parts)])
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_catalog():
+    """Retire every cached catalog entry at once by moving to a new version,
+    and tell other processes (whose local caches hold their own copies)."""
+    bump_catalog_version()
+    publish(CATALOG)
+
+
+@partial(subscribe, local=False)
+def catalog_changed(model, pk):
+    # A shared cache was already moved on by the process that made the change;
+    # a per-process one must follow row changes (row_changed) as well
+    if model in (CATALOG, 'product', 'category') and isinstance(caches['default'], LocMemCache):
+        bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def row_changed(sender, instance, **kwargs):
+    # Facet counts and names depend on every product and category
+    transaction.on_commit(bump_catalog_version)
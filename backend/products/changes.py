@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CatalogChange, Category, Product, Review
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'catalog_changes'
+# Event model for changes that can't be pinned to rows (bulk imports, stock updates)
+CATALOG = 'catalog'
+
+handlers = []
+
+
+def origin():
+    """Identifies this process in the events it sends, so it can skip its own."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def subscribe(handler, local=True):
+    """Call ``handler(model, pk)`` for every change made in another process, and
+    in this one too unless ``local`` is False. ``pk`` is None for a catalog-wide event."""
+    handlers.append((handler, local))
+    return handler
+
+
+def dispatch(model, pk, remote=False):
+    for handler, local in handlers:
+        if not (local or remote):
+            continue
+        try:
+            handler(model, pk)
+        except Exception:
+            logger.exception('Change handler %r failed for %s %s', handler, model, pk)
+
+
+def publish(model, pk=None):
+    """Announce a change once the current transaction commits: handlers in this
+    process run right away, every other process hears it through the listener."""
+    def send():
+        dispatch(model, pk)
+        try:
+            transport().send(model, pk)
+        except Exception:
+            logger.exception('Could not publish change of %s %s', model, pk)
+    transaction.on_commit(send)
+
+
+class PostgresTransport:
+    """NOTIFY on the catalog channel; each listener holds its own LISTEN connection."""
+
+    def send(self, model, pk):
+        payload = json.dumps({'model': model, 'pk': pk, 'origin': origin()})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+
+    def listen(self, stop, ready, receive):
+        listener = connection.get_new_connection(connection.get_connection_params())
+        try:
+            listener.autocommit = True
+            with listener.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            ready.set()
+            while not stop.is_set():
+                if select.select([listener], [], [], settings.CHANGE_POLL_INTERVAL)[0]:
+                    listener.poll()
+                    while listener.notifies:
+                        event = json.loads(listener.notifies.pop(0).payload)
+                        receive(event['model'], event['pk'], event['origin'])
+        finally:
+            listener.close()
+
+
+class PollingTransport:
+    """Rows in ``CatalogChange``, polled every ``CHANGE_POLL_INTERVAL`` seconds.
+
+    Ids from concurrent transactions can commit out of order, so each poll
+    rereads the last ``CHANGE_POLL_OVERLAP`` seconds and skips the rows it has
+    already seen. Rows older than ``CHANGE_RETENTION`` are deleted as it goes.
+    """
+
+    def send(self, model, pk):
+        CatalogChange.objects.create(model=model, object_id=pk, origin=origin())
+
+    def listen(self, stop, ready, receive):
+        overlap = timedelta(seconds=settings.CHANGE_POLL_OVERLAP)
+        since = timezone.now() - overlap
+        seen = {}
+        pruned = 0
+        ready.set()
+        while not stop.wait(settings.CHANGE_POLL_INTERVAL):
+            close_old_connections()
+            now = timezone.now()
+            rows = CatalogChange.objects.filter(created_at__gte=since).order_by('pk')
+            for pk, model, object_id, sender, created_at in rows.values_list(
+                'pk', 'model', 'object_id', 'origin', 'created_at'
+            ):
+                if pk not in seen:
+                    seen[pk] = created_at
+                    receive(model, object_id, sender)
+            since = now - overlap
+            seen = {pk: created_at for pk, created_at in seen.items() if created_at >= since}
+            if time.monotonic() - pruned > settings.CHANGE_RETENTION:
+                pruned = time.monotonic()
+                CatalogChange.objects.filter(created_at__lt=now - timedelta(seconds=settings.CHANGE_RETENTION)).delete()
+
+
+def transport():
+    if settings.CHANGE_TRANSPORT == 'postgres' or (
+        settings.CHANGE_TRANSPORT == 'auto' and connection.vendor == 'postgresql'
+    ):
+        return PostgresTransport()
+    return PollingTransport()
+
+
+class Listener:
+    """A daemon thread applying other processes' changes to this one's caches.
+
+    Started on demand by the caches that need it, and again after a fork (the
+    thread doesn't survive one). When the connection fails, events may have
+    been missed, so a catalog-wide event is dispatched before reconnecting.
+    """
+
+    def __init__(self):
+        self.pid = None
+        self.thread = None
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            ready = threading.Event()
+            self.stop = threading.Event()
+            self.thread = threading.Thread(target=self.run, args=(self.stop, ready), name='catalog-changes', daemon=True)
+            self.pid = os.getpid()
+            self.thread.start()
+        # Don't fill a cache before the listener can hear about changes to it
+        ready.wait(5)
+
+    def shutdown(self):
+        if self.pid == os.getpid() and self.thread.is_alive():
+            self.stop.set()
+            self.thread.join()
+        self.pid = None
+
+    def receive(self, model, pk, sender):
+        if sender != origin():
+            dispatch(model, pk, remote=True)
+
+    def run(self, stop, ready):
+        while not stop.is_set():
+            try:
+                transport().listen(stop, ready, self.receive)
+            except Exception:
+                logger.exception('Catalog change listener failed; reconnecting')
+                ready.set()
+                stop.wait(settings.CHANGE_POLL_INTERVAL)
+                dispatch(CATALOG, None, remote=True)
+            finally:
+                connection.close()
+
+
+listener = Listener()
+
+
+class LocalCache:
+    """A per-process LRU cache kept coherent through change events.
+
+    Each entry is tagged with what it was built from: a model name for
+    anything of that model, or ``(model, pk)`` for one row. A change evicts
+    the entries carrying either tag; a catalog-wide change clears the cache.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        subscribe(self.evict)
+
+    def get(self, key, default=None):
+        listener.ensure_started()
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def set(self, key, value, tags):
+        listener.ensure_started()
+        with self.lock:
+            self.entries[key] = (value, frozenset(tags))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def evict(self, model, pk):
+        with self.lock:
+            if model == CATALOG:
+                self.entries.clear()
+                return
+            stale = [key for key, (_, tags) in self.entries.items() if model in tags or (model, pk) in tags]
+            for key in stale:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def publish_change(sender, instance, **kwargs):
+    publish(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def publish_review(sender, instance, **kwargs):
+    # Reviews show up as their product's rating
+    publish('product', instance.product_id)
@@ -0,0 +1,83 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, IntegerField, Value, When
+from ecommerce_backend.db_router import primary
+
+from .cache import catalog_cache_key
+from .models import Category
+
+# Query parameters that narrow the product list, and so change the facet counts
+FILTER_PARAMS = ('category', 'category__name', 'min_price', 'max_price', 'in_stock', 'search')
+
+
+def price_bucket():
+    bounds = settings.PRODUCT_PRICE_BUCKETS
+    return Case(
+        *[When(price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+        default=Value(len(bounds)),
+        output_field=IntegerField(),
+    )
+
+
+def facet_counts(queryset):
+    """Counts per category, price bucket and stock state of the products in ``queryset``.
+
+    Every combination is counted by one GROUP BY query (the combinations are
+    few, whatever the catalog size) and the three facets are summed from it.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(
+            bucket=price_bucket(),
+            stocked=Case(When(stock_quantity__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField()),
+        )
+        .values('category_id', 'bucket', 'stocked')
+        .annotate(count=Count('pk'))
+    )
+    bounds = settings.PRODUCT_PRICE_BUCKETS
+    categories, buckets, stock = {}, [0] * (len(bounds) + 1), {True: 0, False: 0}
+    for row in rows:
+        categories[row['category_id']] = categories.get(row['category_id'], 0) + row['count']
+        buckets[row['bucket']] += row['count']
+        stock[bool(row['stocked'])] += row['count']
+
+    names = dict(Category.objects.filter(pk__in=categories).values_list('pk', 'name'))
+    edges = [0, *bounds, None]
+    return {
+        'count': sum(buckets),
+        'categories': sorted(
+            ({'id': pk, 'name': names.get(pk), 'count': count} for pk, count in categories.items()),
+            key=lambda facet: (-facet['count'], facet['name'] or ''),
+        ),
+        'price': [
+            {'min': edges[index], 'max': edges[index + 1], 'count': count}
+            for index, count in enumerate(buckets)
+        ],
+        'in_stock': {'true': stock[True], 'false': stock[False]},
+    }
+
+
+def cache_value(name, value):
+    if name == 'search':
+        # Search terms match case-insensitively and split on whitespace
+        return ' '.join(value.lower().split())
+    return value
+
+
+def cached_facet_counts(queryset, params):
+    """``facet_counts`` cached per filter combination until the catalog changes.
+    Searches longer than ``FACET_CACHE_MAX_SEARCH_LENGTH`` are counted uncached."""
+    filters = sorted(
+        (name, cache_value(name, value)) for name in FILTER_PARAMS for value in params.getlist(name) if value
+    )
+    if any(name == 'search' and len(value) > settings.FACET_CACHE_MAX_SEARCH_LENGTH for name, value in filters):
+        return facet_counts(queryset)
+    key = catalog_cache_key('facets', urlencode(filters))
+    facets = cache.get(key)
+    if facets is None:
+        with primary():
+            facets = facet_counts(queryset)
+        cache.set(key, facets, settings.FACET_CACHE_TIMEOUT)
+    return facets
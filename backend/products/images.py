@@ -0,0 +1,99 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def rendition_widths():
+    return getattr(settings, 'PRODUCT_IMAGE_RENDITION_WIDTHS', [200, 400, 800])
+
+
+def rendition_formats():
+    return getattr(settings, 'PRODUCT_IMAGE_RENDITION_FORMATS', ['webp', 'jpeg'])
+
+
+def rendition_name(source_name, width, fmt):
+    stem, _ = os.path.splitext(source_name)
+    return f'{stem}_{width}w.{EXTENSIONS[fmt]}'
+
+
+def build_renditions(field_file):
+    """Write resized copies of an image next to the original.
+
+    Returns the manifest stored in the model's ``image_renditions`` field:
+    the source name and width plus, per format, the stored name for each width.
+    Widths at or above the original are skipped rather than upscaled.
+    """
+    storage = field_file.storage
+    quality = getattr(settings, 'PRODUCT_IMAGE_RENDITION_QUALITY', 80)
+    with storage.open(field_file.name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    manifest = {'source': field_file.name, 'width': original.width}
+    for fmt in rendition_formats():
+        manifest[fmt] = {}
+        for width in sorted(rendition_widths()):
+            if width >= original.width:
+                break
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+            if fmt == 'jpeg' and resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            buffer = BytesIO()
+            resized.save(buffer, PIL_FORMATS[fmt], quality=quality, optimize=True)
+            name = rendition_name(field_file.name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            manifest[fmt][str(width)] = storage.save(name, ContentFile(buffer.getvalue()))
+    return manifest
+
+
+def refresh_renditions(instance):
+    """Regenerate renditions for ``instance`` and store the manifest without touching other fields."""
+    field_file = instance.image
+    manifest = {}
+    if field_file:
+        try:
+            manifest = build_renditions(field_file)
+        except (OSError, Image.DecompressionBombError):
+            logger.exception('Could not build renditions for %s', field_file.name)
+            return
+    instance.image_renditions = manifest
+    type(instance).objects.filter(pk=instance.pk).update(image_renditions=manifest)
+
+
+def schedule_renditions(instance):
+    """Queue rendition generation on the task queue when the image has changed."""
+    from .tasks import build_image_renditions
+
+    current = instance.image.name if instance.image else None
+    if current != (instance.image_renditions or {}).get('source'):
+        build_image_renditions.enqueue(instance._meta.label, instance.pk)
+
+
+def srcset(field_file, manifest, request=None):
+    """``{format: "url 200w, url 400w, ..."}`` including the original at its own width."""
+    if not field_file or not manifest or manifest.get('source') != field_file.name:
+        return {}
+
+    def url(name):
+        location = field_file.storage.url(name)
+        return request.build_absolute_uri(location) if request is not None else location
+
+    original = f"{url(field_file.name)} {manifest['width']}w"
+    result = {}
+    for fmt in rendition_formats():
+        entries = [f'{url(name)} {width}w' for width, name in manifest.get(fmt, {}).items()]
+        if fmt == 'jpeg':
+            entries.append(original)
+        result[fmt] = ', '.join(entries)
+    return result
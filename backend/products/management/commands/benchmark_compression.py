@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from ecommerce_backend.compression import available_encodings, compress, compressed_body
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Report bytes saved and CPU time per encoding for typical API responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Extra API paths to measure')
+        parser.add_argument('--user', help='Email of the user to log in as for the cart and order endpoints')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        client = Client()
+        paths = ['/api/products/', '/api/products/featured/', '/api/categories/']
+        product = Product.objects.filter(is_active=True).order_by('pk').first()
+        if product:
+            paths.append(f'/api/products/{product.pk}/')
+        if options['user']:
+            User = get_user_model()
+            user = User.objects.filter(**{User.USERNAME_FIELD: options['user']}).first()
+            if user is None:
+                raise CommandError(f"No user with {User.USERNAME_FIELD} {options['user']}")
+            client.force_login(user)
+            paths += ['/api/cart/', '/api/orders/']
+        paths += options['paths']
+
+        encodings = available_encodings()
+        self.stdout.write(f"Encodings: {', '.join(encodings)}")
+        for path in paths:
+            response = client.get(path, HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='identity')
+            if response.status_code != 200:
+                self.stdout.write(f'{path}: HTTP {response.status_code}, skipped')
+                continue
+            data = response.content
+            self.stdout.write(f'{path} ({len(data)} bytes)')
+            for encoding in encodings:
+                size = len(compress(data, encoding))
+                cpu = self.cpu_ms(lambda: compress(data, encoding), options['repeat'])
+                compressed_body(data, encoding)
+                reuse = self.cpu_ms(lambda: compressed_body(data, encoding), options['repeat'])
+                self.stdout.write(
+                    f'  {encoding:<5} {size:9} bytes  saved {1 - size / len(data):6.1%}  '
+                    f'{cpu:7.3f} ms cpu  {reuse:7.3f} ms from cache'
+                )
+
+    def cpu_ms(self, call, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.process_time()
+            call()
+            elapsed = time.process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
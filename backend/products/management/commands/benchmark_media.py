@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+from ecommerce_backend.media import serve_media
+
+class Command(BaseCommand):
+    help = 'Compare media serving throughput of serve_media against django.views.static.serve'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1024 * 1024, help='Test file size in bytes')
+        parser.add_argument('--requests', type=int, default=200)
+    
+    def handle(self, *args, **options):
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        factory = RequestFactory()
+        with tempfile.NamedTemporaryFile(dir=settings.MEDIA_ROOT, suffix='.bin', delete=False) as file:
+            file.write(os.urandom(options['size']))
+        name = os.path.basename(file.name)
+        try:
+            etag = serve_media(factory.get('/'), name)['ETag']
+            cases = [
+                ('static.serve full file', lambda: serve(factory.get('/'), name, document_root=settings.MEDIA_ROOT)),
+                ('serve_media full file', lambda: serve_media(factory.get('/'), name)),
+                ('serve_media 64KB range', lambda: serve_media(factory.get('/', HTTP_RANGE='bytes=0-65535'), name)),
+                ('serve_media revalidation', lambda: serve_media(factory.get('/', HTTP_IF_NONE_MATCH=etag), name)),
+            ]
+            with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='', MEDIA_SENDFILE_HEADER=''):
+                for label, call in cases:
+                    self.report(label, call, options['requests'])
+            with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+                self.report('serve_media X-Accel-Redirect', lambda: serve_media(factory.get('/'), name), options['requests'])
+        finally:
+            os.remove(file.name)
+    
+    def report(self, label, call, count):
+        transferred = 0
+        started = time.perf_counter()
+        for _ in range(count):
+            response = call()
+            body = response.streaming_content if response.streaming else [response.content]
+            transferred += sum(len(chunk) for chunk in body)
+            response.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<30} {count / elapsed:>9.0f} req/s {transferred / elapsed / 1e6:>9.1f} MB/s'
+        )
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from rest_framework.renderers import JSONRenderer
+from ecommerce_backend.renderers import FastJSONRenderer
+from orders.models import Order
+from orders.serializers import OrderListSerializer
+from products.models import Product
+from products.serializers import ProductListSerializer
+
+class Command(BaseCommand):
+    help = 'Compare per-row cost of ModelSerializer + JSONRenderer against the values() path + FastJSONRenderer'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+    
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/')
+        context = {'request': request}
+        cases = [
+            (
+                'products',
+                ProductListSerializer,
+                Product.objects.filter(is_active=True).select_related('category', 'rating_stats').order_by('-created_at'),
+            ),
+            ('orders', OrderListSerializer, Order.objects.order_by('-created_at')),
+        ]
+        for label, serializer_class, queryset in cases:
+            instances = list(queryset[:options['rows']])
+            if not instances:
+                self.stdout.write(f'{label}: no rows, skipped')
+                continue
+            fast = serializer_class(context=context)
+            rows = list(queryset.values(*fast.values_lookups())[:options['rows']])
+            
+            slow_bytes = JSONRenderer().render(serializer_class(instances, many=True, context=context).data)
+            fast_bytes = FastJSONRenderer().render(fast.represent_values(rows))
+            if slow_bytes != fast_bytes:
+                raise CommandError(f'{label}: fast path output differs from the serializer output')
+            
+            results = {
+                'serializer': self.per_row(lambda: serializer_class(instances, many=True, context=context).data, len(rows), options['repeat']),
+                'values': self.per_row(lambda: fast.represent_values(rows), len(rows), options['repeat']),
+                'JSONRenderer': self.per_row(lambda: JSONRenderer().render(fast.represent_values(rows)), len(rows), options['repeat']),
+                'FastJSONRenderer': self.per_row(lambda: FastJSONRenderer().render(fast.represent_values(rows)), len(rows), options['repeat']),
+            }
+            self.stdout.write(f'{label} ({len(rows)} rows, output identical):')
+            for name, micros in results.items():
+                self.stdout.write(f'  {name:<18} {micros:8.2f} us/row')
+    
+    def per_row(self, call, count, repeat):
+        best = min(self.timed(call) for _ in range(repeat))
+        return best / count * 1_000_000
+    
+    def timed(self, call):
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
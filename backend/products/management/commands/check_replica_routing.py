@@ -0,0 +1,52 @@
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from ecommerce_backend.db_router import pin_key
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Show which database serves the queries of catalog requests, unpinned and pinned to the primary'
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured; set DATABASE_REPLICA_URLS')
+
+        client = Client()
+        paths = ['/api/products/', '/api/categories/']
+        product = Product.objects.filter(is_active=True).order_by('pk').first()
+        if product:
+            paths += [
+                f'/api/products/{product.pk}/',
+                f'/api/products/{product.pk}/reviews/',
+                f'/api/products/search/?q={quote(product.name)}',
+            ]
+
+        key = pin_key(RequestFactory().get('/'))
+        for pinned in (False, True):
+            self.stdout.write('Pinned to primary (after a write):' if pinned else 'Anonymous reads:')
+            if pinned:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+            try:
+                for path in paths:
+                    self.stdout.write(f'  {path:<40} {self.route(client, path)}')
+            finally:
+                cache.delete(key)
+
+    def route(self, client, path):
+        aliases = ['default', *settings.REPLICA_DATABASES]
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in aliases]
+        for context in contexts:
+            context.__enter__()
+        try:
+            status = client.get(path).status_code
+        finally:
+            for context in contexts:
+                context.__exit__(None, None, None)
+        counts = ', '.join(f'{alias}={len(context)}' for alias, context in zip(aliases, contexts))
+        return f'HTTP {status}  queries: {counts}'
@@ -0,0 +1,37 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from products.bulk import RENDERERS, export_rows, guess_format
+
+class Command(BaseCommand):
+    help = 'Stream all products to a CSV or NDJSON file (or stdout) in constant memory'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Output file, '-' for stdout")
+        parser.add_argument('--format', choices=RENDERERS.keys(), help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+    
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        started = time.monotonic()
+        count = 0
+        
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+        
+        output = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        try:
+            for chunk in RENDERERS[fmt](counted(export_rows(chunk_size=options['chunk_size']))):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        
+        elapsed = time.monotonic() - started
+        rate = round(count / elapsed) if elapsed else count
+        self.stderr.write(f'Exported {count} products in {elapsed:.3f}s ({rate} rows/sec)')
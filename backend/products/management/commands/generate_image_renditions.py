@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from products.images import refresh_renditions
+from products.models import Product, ProductImage
+
+class Command(BaseCommand):
+    help = 'Generate resized image renditions for products and gallery images that lack them'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate even up-to-date renditions')
+    
+    def handle(self, *args, **options):
+        for model in (Product, ProductImage):
+            queryset = model.objects.exclude(image='').exclude(image__isnull=True)
+            generated = 0
+            for instance in queryset.only('pk', 'image', 'image_renditions').iterator():
+                if options['force'] or instance.image_renditions.get('source') != instance.image.name:
+                    refresh_renditions(instance)
+                    generated += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: generated renditions for {generated} image(s)')
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from products.bulk import IMPORT_FORMATS, ProductImporter, guess_format, parse_rows
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a CSV or NDJSON file, upserting by SKU (or name)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-errors', type=int, default=100, help='Number of row errors to print')
+    
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        importer = ProductImporter(batch_size=options['batch_size'], max_errors=options['max_errors'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                report = importer.run(parse_rows(lines, fmt))
+        except OSError as exc:
+            raise CommandError(str(exc))
+        
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows']} rows in {report['seconds']}s "
+            f"({report['rows_per_second']} rows/sec): {report['created']} created, "
+            f"{report['updated']} updated, {report['error_count']} failed"
+        ))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from products.models import ProductRatingStats
+
+STAT_FIELDS = list(ProductRatingStats.STAR_FIELDS.values()) + ['rating_sum', 'review_count']
+
+class Command(BaseCommand):
+    help = 'Rebuild ProductRatingStats from Review rows, or check them for drift with --check'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report mismatched products')
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_stats()
+        else:
+            self.rebuild(options['batch_size'])
+    
+    def expected_stats(self):
+        for row in ProductRatingStats.aggregate_reviews().iterator():
+            yield row['product_id'], {field: row[field] for field in STAT_FIELDS}
+    
+    def check_stats(self):
+        stored = {
+            row.pop('product_id'): row
+            for row in ProductRatingStats.objects.values('product_id', *STAT_FIELDS).iterator()
+        }
+        mismatched = []
+        for product_id, expected in self.expected_stats():
+            if stored.pop(product_id, None) != expected:
+                mismatched.append(product_id)
+        # Rows left over have no reviews behind them; only zeroed rows are consistent
+        mismatched += [
+            product_id for product_id, row in stored.items() if any(row.values())
+        ]
+        if mismatched:
+            raise CommandError(
+                f"{len(mismatched)} product(s) with inconsistent rating stats: "
+                + ', '.join(str(product_id) for product_id in sorted(mismatched)[:50])
+            )
+        self.stdout.write(self.style.SUCCESS('Rating stats are consistent'))
+    
+    @transaction.atomic
+    def rebuild(self, batch_size):
+        ProductRatingStats.objects.all().delete()
+        batch = []
+        total = 0
+        for product_id, values in self.expected_stats():
+            batch.append(ProductRatingStats(product_id=product_id, **values))
+            if len(batch) >= batch_size:
+                ProductRatingStats.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        ProductRatingStats.objects.bulk_create(batch)
+        total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating stats for {total} product(s)'))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_rating_stats(apps, schema_editor):
+    Review = apps.get_model('products', 'Review')
+    ProductRatingStats = apps.get_model('products', 'ProductRatingStats')
+    rows = Review.objects.order_by().values('product_id').annotate(
+        rating_sum=models.Sum('rating'),
+        review_count=models.Count('id'),
+        **{
+            f'count_{star}': models.Count('id', filter=models.Q(rating=star))
+            for star in range(1, 6)
+        }
+    )
+    ProductRatingStats.objects.bulk_create(
+        [ProductRatingStats(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='products.product')),
+                ('count_1', models.PositiveIntegerField(default=0)),
+                ('count_2', models.PositiveIntegerField(default=0)),
+                ('count_3', models.PositiveIntegerField(default=0)),
+                ('count_4', models.PositiveIntegerField(default=0)),
+                ('count_5', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product rating stats',
+            },
+        ),
+        migrations.RunPython(populate_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'is_active', 'price', 'stock_quantity'], name='product_facet_idx'),
+        ),
+    ]
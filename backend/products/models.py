@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from .images import schedule_renditions
 
 User = get_user_model()
 
@@ -16,18 +18,33 @@ class Category(models.Model):
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     stock_quantity = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Covers the facet counts (and category listings) without reading the table
+            models.Index(fields=['category', 'is_active', 'price', 'stock_quantity'], name='product_facet_idx'),
+        ]
+    
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        # Blank SKUs are stored as NULL so they don't collide on the unique index
+        if not self.sku:
+            self.sku = None
+        super().save(*args, **kwargs)
+        schedule_renditions(self)
+    
     @property
     def is_in_stock(self):
         return self.stock_quantity > 0
@@ -35,10 +52,15 @@ class Product(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/gallery/')
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True)
     
     def __str__(self):
         return f"{self.product.name} - Image"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        schedule_renditions(self)
 
 class Review(models.Model):
     RATING_CHOICES = [
@@ -60,3 +82,93 @@ class Review(models.Model):
     
     def __str__(self):
         return f"{self.product.name} - {self.rating} stars"
+
+class ProductRatingStats(models.Model):
+    """Per-product review aggregates, maintained alongside Review writes.
+    
+    The review views and admin keep them current. Reviews deleted by cascade
+    (when their user is deleted) are not subtracted; ``rebuild_rating_stats``
+    repairs the affected products.
+    """
+    STAR_FIELDS = {1: 'count_1', 2: 'count_2', 3: 'count_3', 4: 'count_4', 5: 'count_5'}
+    
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='rating_stats')
+    count_1 = models.PositiveIntegerField(default=0)
+    count_2 = models.PositiveIntegerField(default=0)
+    count_3 = models.PositiveIntegerField(default=0)
+    count_4 = models.PositiveIntegerField(default=0)
+    count_5 = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Product rating stats"
+    
+    def __str__(self):
+        return f"{self.product_id} - {self.review_count} reviews"
+    
+    @property
+    def histogram(self):
+        return {str(star): getattr(self, field) for star, field in self.STAR_FIELDS.items()}
+    
+    @property
+    def average_rating(self):
+        return self.compute_average(self.rating_sum, self.review_count)
+    
+    @staticmethod
+    def compute_average(rating_sum, review_count):
+        if review_count:
+            return round(rating_sum / review_count, 1)
+        return 0
+    
+    @classmethod
+    def for_product(cls, product):
+        try:
+            return product.rating_stats
+        except cls.DoesNotExist:
+            return cls(product=product)
+    
+    @classmethod
+    def record(cls, product_id, added=None, removed=None):
+        """Apply a review rating change; call inside the transaction writing the Review."""
+        changes = {}
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating is None:
+                continue
+            field = cls.STAR_FIELDS[rating]
+            changes[field] = changes.get(field, 0) + delta
+            changes['rating_sum'] = changes.get('rating_sum', 0) + delta * rating
+            changes['review_count'] = changes.get('review_count', 0) + delta
+        changes = {field: delta for field, delta in changes.items() if delta}
+        if not changes:
+            return
+        cls.objects.get_or_create(product_id=product_id)
+        cls.objects.filter(product_id=product_id).update(
+            updated_at=timezone.now(),
+            **{field: models.F(field) + delta for field, delta in changes.items()}
+        )
+    
+    @classmethod
+    def aggregate_reviews(cls, reviews=None):
+        """Recompute stats rows from Review with one grouped query."""
+        if reviews is None:
+            reviews = Review.objects.all()
+        return reviews.order_by().values('product_id').annotate(
+            rating_sum=models.Sum('rating'),
+            review_count=models.Count('id'),
+            **{
+                field: models.Count('id', filter=models.Q(rating=star))
+                for star, field in cls.STAR_FIELDS.items()
+            }
+        )
+
+class CatalogChange(models.Model):
+    """Change events read by other processes when LISTEN/NOTIFY isn't available (see products.changes)."""
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField(null=True)
+    origin = models.CharField(max_length=100)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f"{self.model} {self.object_id} from {self.origin}"
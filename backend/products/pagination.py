@@ -0,0 +1,7 @@
+from rest_framework.pagination import CursorPagination
+
+class ReviewCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-created_at', '-id')
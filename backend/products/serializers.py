@@ -1,10 +1,16 @@
 from rest_framework import serializers
-from .models import Category, Product, ProductImage, Review
+from .models import Category, Product, ProductImage, Review, ProductRatingStats
+from .images import srcset
 from django.contrib.auth import get_user_model
+from ecommerce_backend.serialization import DynamicFieldsMixin, ValuesRepresentationMixin
 
 User = get_user_model()
 
-class CategorySerializer(serializers.ModelSerializer):
+# Number of most recent reviews embedded in the product detail payload; the
+# full list is served by the paginated product reviews endpoint.
+DETAIL_REVIEW_LIMIT = 5
+
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -12,12 +18,20 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'created_at', 'product_count']
     
     def get_product_count(self, obj):
+        if hasattr(obj, 'active_product_count'):
+            return obj.active_product_count
         return obj.products.filter(is_active=True).count()
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ImageSrcsetMixin:
+    def get_image_srcset(self, obj):
+        return srcset(obj.image, obj.image_renditions, self.context.get('request'))
+
+class ProductImageSerializer(ImageSrcsetMixin, serializers.ModelSerializer):
+    image_srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text']
+        fields = ['id', 'image', 'image_srcset', 'alt_text']
 
 class ReviewSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -31,47 +45,140 @@ class ReviewSerializer(serializers.ModelSerializer):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(DynamicFieldsMixin, ValuesRepresentationMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_srcset = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
     
+    expandable_fields = {
+        'category': lambda: CategorySerializer(read_only=True, fields='id,name,description'),
+    }
+    select_related_fields = {
+        'category_name': ['category'],
+        'category': ['category'],
+        'average_rating': ['rating_stats'],
+        'review_count': ['rating_stats'],
+    }
+    values_map = {'id': 'id', 'name': 'name', 'price': 'price', 'category_name': 'category__name'}
+    extra_values = {
+        'image': ['image'],
+        'image_srcset': ['image', 'image_renditions'],
+        'is_in_stock': ['stock_quantity'],
+        'average_rating': ['rating_stats__rating_sum', 'rating_stats__review_count'],
+        'review_count': ['rating_stats__review_count'],
+    }
+    
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price', 'image', 'category_name', 'is_in_stock', 'average_rating', 'review_count']
+        fields = ['id', 'name', 'price', 'image', 'image_srcset', 'category_name', 'is_in_stock', 'average_rating', 'review_count']
     
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return round(sum(review.rating for review in reviews) / len(reviews), 1)
-        return 0
+        return ProductRatingStats.for_product(obj).average_rating
     
     def get_review_count(self, obj):
-        return obj.reviews.count()
+        return ProductRatingStats.for_product(obj).review_count
+    
+    def image_file(self, row):
+        field = Product._meta.get_field('image')
+        return field.attr_class(None, field, row['image'])
+    
+    def value_image(self, row):
+        return self.fields['image'].to_representation(self.image_file(row))
+    
+    def value_image_srcset(self, row):
+        return srcset(self.image_file(row), row['image_renditions'], self.context.get('request'))
+    
+    def value_is_in_stock(self, row):
+        return row['stock_quantity'] > 0
+    
+    def value_average_rating(self, row):
+        return ProductRatingStats.compute_average(
+            row['rating_stats__rating_sum'], row['rating_stats__review_count']
+        )
+    
+    def value_review_count(self, row):
+        return row['rating_stats__review_count'] or 0
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(DynamicFieldsMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
+    image_srcset = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
+    available_quantity = serializers.SerializerMethodField()
+    
+    select_related_fields = {
+        'category': ['category'],
+        'rating_histogram': ['rating_stats'],
+        'average_rating': ['rating_stats'],
+        'review_count': ['rating_stats'],
+    }
+    prefetch_related_fields = {'images': ['images']}
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'image', 'images', 
-                 'stock_quantity', 'is_active', 'is_in_stock', 'created_at', 'updated_at',
-                 'reviews', 'average_rating', 'review_count']
+        fields = ['id', 'name', 'sku', 'description', 'price', 'category', 'image', 'image_srcset', 'images', 
+                 'stock_quantity', 'available_quantity', 'is_active', 'is_in_stock', 'created_at', 'updated_at',
+                 'reviews', 'rating_histogram', 'average_rating', 'review_count']
+    
+    def get_reviews(self, obj):
+        reviews = (
+            obj.reviews.select_related('user')
+            .order_by('-created_at', '-id')[:DETAIL_REVIEW_LIMIT]
+        )
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+    
+    def get_rating_histogram(self, obj):
+        return ProductRatingStats.for_product(obj).histogram
     
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return round(sum(review.rating for review in reviews) / len(reviews), 1)
-        return 0
+        return ProductRatingStats.for_product(obj).average_rating
     
     def get_review_count(self, obj):
-        return obj.reviews.count()
+        return ProductRatingStats.for_product(obj).review_count
+    
+    def get_available_quantity(self, obj):
+        # Stock minus unexpired cart holds (the shopper's own included)
+        from cart.reservations import held_quantities
+        return max(obj.stock_quantity - held_quantities([obj.pk]).get(obj.pk, 0), 0)
+
+class ProductRatingStatsSerializer(serializers.ModelSerializer):
+    histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = ProductRatingStats
+        fields = ['product', 'histogram', 'average_rating', 'rating_sum', 'review_count', 'updated_at']
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price', 'category', 'image', 'stock_quantity', 'is_active']
+        fields = ['name', 'sku', 'description', 'price', 'category', 'image', 'stock_quantity', 'is_active']
+
+class InventoryUpdateItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+    stock_delta = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    price_delta = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    
+    def validate(self, attrs):
+        if 'stock_quantity' in attrs and 'stock_delta' in attrs:
+            raise serializers.ValidationError("Provide either stock_quantity or stock_delta, not both.")
+        if 'price' in attrs and 'price_delta' in attrs:
+            raise serializers.ValidationError("Provide either price or price_delta, not both.")
+        if len(attrs) == 1:
+            raise serializers.ValidationError("Nothing to update.")
+        return attrs
+
+class InventoryBulkUpdateSerializer(serializers.Serializer):
+    updates = InventoryUpdateItemSerializer(many=True, allow_empty=False, max_length=5000)
+    
+    def validate_updates(self, value):
+        ids = [item['id'] for item in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each product may appear only once per batch.")
+        return value
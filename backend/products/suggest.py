@@ -0,0 +1,262 @@
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from ecommerce_backend.db_router import primary
+
+from .changes import CATALOG, listener, subscribe
+from .models import Category, Product
+
+# Sorts after any character a name can contain; ``prefix + END`` bounds a prefix range
+END = chr(0x10FFFF)
+SEPARATOR = '\0'
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace: 'Café  Crème' -> 'cafe creme'."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
+def terms(label):
+    """The keys a name is found under: the whole name and the rest of it from each later word."""
+    words = normalize(label).split(' ')
+    limit = settings.SUGGEST_TERMS_PER_NAME
+    return [' '.join(words[start:]) for start in range(min(len(words), limit)) if words[start]]
+
+
+class PrefixIndex:
+    """Names in a sorted array searched with bisect, returning the most popular matches.
+
+    A prefix matching at most ``scan_limit`` keys is answered by sorting that
+    slice. Longer ranges (short prefixes) use a top list kept per such prefix,
+    built bottom-up from its children and updated in place as entries come
+    and go. Those lists hold twice ``top_size`` so removals rarely leave one
+    too short; a short one is rebuilt from the range on its next lookup.
+    """
+
+    def __init__(self, scan_limit=500, top_size=20):
+        self.scan_limit = scan_limit
+        self.top_size = top_size
+        self.keys = []
+        self.entries = {}
+        self.sizes = Counter()
+        self.tops = {}
+        self.lock = threading.RLock()
+
+    def score(self, uid):
+        return self.entries[uid][1]
+
+    def build(self, items):
+        """Replace the contents with ``(uid, label, score)`` items."""
+        with self.lock:
+            self.entries = {uid: (label, score) for uid, label, score in items}
+            self.sizes = Counter(kind for kind, _ in self.entries)
+            self.keys = sorted(
+                f'{term}{SEPARATOR}{uid[0]}:{uid[1]}'
+                for uid, (label, _) in self.entries.items() for term in terms(label)
+            )
+            self.tops = {}
+            self._collect('', 0, len(self.keys))
+
+    def _uid(self, key):
+        kind, pk = key.rsplit(SEPARATOR, 1)[1].split(':')
+        return kind, int(pk)
+
+    def _best(self, uids, size=None):
+        return heapq.nlargest(size or self.top_size, set(uids), key=lambda uid: (self.score(uid), uid))
+
+    def _collect(self, prefix, lo, hi):
+        if hi - lo <= self.scan_limit:
+            return self._best((self._uid(key) for key in self.keys[lo:hi]), 2 * self.top_size)
+        depth = len(prefix)
+        candidates = []
+        position = lo
+        while position < hi:
+            char = self.keys[position][depth]
+            if char == SEPARATOR:
+                # Names that end exactly here sort first
+                end = bisect_left(self.keys, prefix + chr(1), position, hi)
+                candidates += [self._uid(key) for key in self.keys[position:end]]
+            else:
+                end = bisect_left(self.keys, prefix + char + END, position, hi)
+                candidates += self._collect(prefix + char, position, end)
+            position = end
+        self.tops[prefix] = self._best(candidates, 2 * self.top_size)
+        return self.tops[prefix]
+
+    def _range(self, prefix):
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + END)
+
+    def search(self, text, limit=10):
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        with self.lock:
+            lo, hi = self._range(prefix)
+            if hi - lo <= self.scan_limit:
+                uids = self._best(self._uid(key) for key in self.keys[lo:hi])
+            else:
+                if len(self.tops.get(prefix, ())) < limit:
+                    self.tops[prefix] = self._best((self._uid(key) for key in self.keys[lo:hi]), 2 * self.top_size)
+                uids = self.tops[prefix]
+            return [(uid, self.entries[uid][0]) for uid in uids[:limit]]
+
+    def remove(self, uid):
+        with self.lock:
+            entry = self.entries.pop(uid, None)
+            if entry is None:
+                return
+            self.sizes[uid[0]] -= 1
+            for term in terms(entry[0]):
+                key = f'{term}{SEPARATOR}{uid[0]}:{uid[1]}'
+                index = bisect_left(self.keys, key)
+                if index < len(self.keys) and self.keys[index] == key:
+                    del self.keys[index]
+                for depth in range(len(term) + 1):
+                    top = self.tops.get(term[:depth])
+                    if top is not None and uid in top:
+                        top.remove(uid)
+
+    def add(self, uid, label, score=None):
+        """Add or replace an entry; ``score`` defaults to its current one (0 when new)."""
+        with self.lock:
+            if score is None:
+                score = self.entries[uid][1] if uid in self.entries else 0
+            self.remove(uid)
+            self.entries[uid] = (label, score)
+            self.sizes[uid[0]] += 1
+            for term in terms(label):
+                insort(self.keys, f'{term}{SEPARATOR}{uid[0]}:{uid[1]}')
+                for depth in range(len(term) + 1):
+                    top = self.tops.get(term[:depth])
+                    if top is not None and uid not in top:
+                        top.append(uid)
+                        top.sort(key=lambda other: (self.score(other), other), reverse=True)
+                        del top[2 * self.top_size:]
+
+    def __contains__(self, uid):
+        return uid in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def catalog_items():
+    """``(uid, label, score)`` for categories and the ``SUGGEST_MAX_PRODUCTS`` most popular
+    active products, popularity being review count plus units sold recently."""
+    from orders.models import DailyProductSales
+
+    since = timezone.now().date() - timedelta(days=settings.SUGGEST_POPULARITY_DAYS)
+    sold = dict(
+        DailyProductSales.objects.filter(day__gte=since).order_by()
+        .values_list('product_id').annotate(units=Sum('units'))
+    )
+    limit = settings.SUGGEST_MAX_PRODUCTS
+    reviewed = (
+        Product.objects.filter(is_active=True)
+        .order_by(F('rating_stats__review_count').desc(nulls_last=True), '-pk')
+        .values_list('pk', 'name', 'rating_stats__review_count')[:limit]
+    )
+    products = {pk: (name, reviews or 0) for pk, name, reviews in reviewed.iterator()}
+    missing = [pk for pk in sold if pk not in products]
+    for start in range(0, len(missing), 1000):
+        for pk, name, reviews in Product.objects.filter(pk__in=missing[start:start + 1000], is_active=True).values_list(
+            'pk', 'name', 'rating_stats__review_count'
+        ):
+            products[pk] = (name, reviews or 0)
+    scored = [(('product', pk), name, reviews + sold.get(pk, 0)) for pk, (name, reviews) in products.items()]
+    items = heapq.nlargest(limit, scored, key=lambda item: item[2])
+
+    categories = Category.objects.annotate(active=Count('products', filter=Q(products__is_active=True)))
+    items += [(('category', pk), name, active) for pk, name, active in categories.values_list('pk', 'name', 'active')]
+    return items
+
+
+class CatalogSuggestions:
+    """The per-process index: built on first use, kept current by the change events
+    of every process (products.changes) and rebuilt every ``SUGGEST_REBUILD_SECONDS``
+    to pick up popularity changes, or after a catalog-wide change. The old index keeps
+    serving during a rebuild.
+
+    Row events only update products already in the index, or add them while it
+    holds fewer than ``SUGGEST_MAX_PRODUCTS``, so it never grows past the cap.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.built_at = 0
+        self.invalidated_at = None
+        self.pending = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        listener.ensure_started()
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.rebuild()
+        elif self.stale() and self.lock.acquire(blocking=False):
+            try:
+                self.rebuild()
+            finally:
+                self.lock.release()
+        return self.index
+
+    def stale(self):
+        if self.invalidated_at is not None and self.invalidated_at >= self.built_at:
+            return True
+        return time.monotonic() - self.built_at > settings.SUGGEST_REBUILD_SECONDS
+
+    def rebuild(self):
+        # Changes committed while the catalog is read are replayed onto the new index;
+        # a catalog-wide one makes the next request rebuild again
+        self.pending = []
+        started = time.monotonic()
+        try:
+            index = PrefixIndex(settings.SUGGEST_SCAN_LIMIT, settings.SUGGEST_MAX_RESULTS)
+            with primary():
+                index.build(catalog_items())
+            for uid, label in self.pending:
+                self.apply(index, uid, label)
+            self.index, self.built_at = index, started
+        finally:
+            self.pending = None
+
+    def search(self, text, limit):
+        return self.get().search(text, limit)
+
+    @staticmethod
+    def apply(index, uid, label):
+        if label is None:
+            index.remove(uid)
+        elif uid in index or uid[0] == 'category' or index.sizes['product'] < settings.SUGGEST_MAX_PRODUCTS:
+            index.add(uid, label)
+
+    def changed(self, model, pk):
+        """Reload a saved or deleted product or category, if the index is built;
+        a catalog-wide change schedules a rebuild."""
+        if model == CATALOG:
+            self.invalidated_at = time.monotonic()
+            return
+        if model not in ('product', 'category') or (self.index is None and self.pending is None):
+            return
+        if model == 'product':
+            label = Product.objects.filter(pk=pk, is_active=True).values_list('name', flat=True).first()
+        else:
+            label = Category.objects.filter(pk=pk).values_list('name', flat=True).first()
+        if self.pending is not None:
+            self.pending.append(((model, pk), label))
+        if self.index is not None:
+            self.apply(self.index, (model, pk), label)
+
+
+suggestions = CatalogSuggestions()
+subscribe(suggestions.changed)
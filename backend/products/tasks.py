@@ -0,0 +1,10 @@
+from django.apps import apps
+from taskqueue.registry import task
+from .images import refresh_renditions
+
+
+@task
+def build_image_renditions(model_label, pk):
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is not None:
+        refresh_renditions(instance)
@@ -1,3 +1,518 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from ecommerce_backend.db_router import replicas_allowed
+from ecommerce_backend.renderers import FastJSONRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from accounts.models import User
+from .cache import invalidate_catalog
+from .changes import CATALOG, dispatch
+from .models import Category, Product
+from .serializers import ProductListSerializer
+from .suggest import suggestions
+from .views import category_lists
+
+
+class QueryCounter:
+    """Queries run on each database alias inside the block."""
+
+    def __init__(self, aliases=('default', 'replica1')):
+        self.contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in aliases}
+
+    def __enter__(self):
+        for context in self.contexts.values():
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for context in self.contexts.values():
+            context.__exit__(*exc_info)
+
+    def __getitem__(self, alias):
+        return len(self.contexts[alias])
+
+    def catalog(self, alias):
+        """Queries on ``alias`` touching products tables (other apps are never routed)."""
+        return [query['sql'] for query in self.contexts[alias].captured_queries if '"products_' in query['sql']]
+
+
+@skipUnless('replica1' in settings.DATABASES, 'needs --settings=ecommerce_backend.settings_test')
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        category_lists.clear()
+        category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price=999, stock_quantity=5, category=category
+        )
+        self.user = User.objects.create_user(
+            email='shopper@example.com', username='shopper', password='secret', first_name='A', last_name='B'
+        )
+        self.client = APIClient()
+
+    def test_catalog_reads_go_to_replica(self):
+        for path in ['/api/products/', f'/api/products/{self.product.pk}/']:
+            with QueryCounter() as queries:
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(queries['replica1'], 0, path)
+            self.assertEqual(queries.catalog('default'), [], path)
+
+    def test_cached_catalog_reads_fill_from_primary(self):
+        # Change events evict these on the primary's commit; a lagging replica
+        # would refill them with the old rows until the next change
+        for path in ['/api/categories/', '/api/products/facets/']:
+            with QueryCounter() as queries:
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(queries.catalog('default'), [], path)
+            self.assertEqual(queries['replica1'], 0, path)
+
+    def test_unsafe_requests_stay_on_primary(self):
+        self.client.force_authenticate(self.user)
+        with QueryCounter() as queries:
+            response = self.client.post(
+                f'/api/products/{self.product.pk}/reviews/', {'rating': 4, 'comment': 'Good'}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(queries['default'], 0)
+        self.assertEqual(queries['replica1'], 0)
+
+    def test_pinned_client_reads_primary(self):
+        self.client.force_authenticate(self.user)
+        self.client.post(f'/api/products/{self.product.pk}/reviews/', {'rating': 5, 'comment': 'Great'})
+        with QueryCounter() as queries:
+            response = self.client.get(f'/api/products/{self.product.pk}/')
+        self.assertEqual(response.json()['review_count'], 1)
+        self.assertEqual(queries['replica1'], 0)
+
+    def test_atomic_blocks_and_select_for_update_stay_on_primary(self):
+        token = replicas_allowed.set(True)
+        try:
+            with QueryCounter() as queries:
+                list(Product.objects.all())
+            self.assertEqual((queries['default'], queries['replica1']), (0, 1))
+
+            with QueryCounter() as queries, transaction.atomic():
+                list(Product.objects.all())
+                list(Product.objects.select_for_update().filter(pk=self.product.pk))
+            self.assertEqual(queries['replica1'], 0)
+        finally:
+            replicas_allowed.reset(token)
+
+    def test_related_lookups_follow_their_instance(self):
+        product = Product.objects.using('default').get(pk=self.product.pk)
+        token = replicas_allowed.set(True)
+        try:
+            with QueryCounter() as queries:
+                product.category
+            self.assertEqual((queries['default'], queries['replica1']), (1, 0))
+        finally:
+            replicas_allowed.reset(token)
+
+
+class FacetCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Laptop', description='Light', price='999.00', category=self.category, stock_quantity=5
+        )
+        self.client = APIClient()
+
+    def facets(self, query=''):
+        return self.client.get(f'/api/products/facets/{query}').json()
+
+    def test_saving_and_deleting_rows_refresh_the_counts(self):
+        self.assertEqual(self.facets()['in_stock'], {'true': 1, 'false': 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock_quantity = 0
+            self.product.save()
+        self.assertEqual(self.facets()['in_stock'], {'true': 0, 'false': 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Notebooks'
+            self.category.save()
+        self.assertEqual(self.facets()['categories'][0]['name'], 'Notebooks')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self.facets()['count'], 0)
+
+    def test_changes_from_other_processes_refresh_the_counts(self):
+        self.facets()
+        # As another process would: no signals here, only its event
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=0)
+        dispatch('product', self.product.pk, remote=True)
+        self.assertEqual(self.facets()['in_stock'], {'true': 0, 'false': 1})
+
+    def test_search_is_normalised_in_the_key(self):
+        self.facets('?search=LAPTOP')
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.assertEqual(self.facets('?search=%20laptop%20')['count'], 1)
+        self.assertEqual(len(queries), 0)
+
+    def test_invalid_prices_are_rejected(self):
+        for path in ['/api/products/facets/', '/api/products/']:
+            response = self.client.get(f'{path}?min_price=abc')
+            self.assertEqual(response.status_code, 400, path)
+            self.assertIn('min_price', response.json())
+        self.assertEqual(self.facets('?min_price=500&max_price=1000')['count'], 1)
+
+    @override_settings(FACET_CACHE_MAX_SEARCH_LENGTH=5)
+    def test_long_searches_are_not_cached(self):
+        self.facets('?search=laptop')
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.assertEqual(self.facets('?search=laptop')['count'], 1)
+        self.assertGreater(len(queries), 0)
+
+
+def watch():
+    """Run in the processes started by ``CacheCoherenceTests``: answer each line
+    on stdin with what this process's caches currently serve."""
+    client = Client()
+    for _ in sys.stdin:
+        categories = client.get('/api/categories/').json()['results']
+        suggested = client.get('/api/products/suggest/?q=tablet').json()['results']
+        state = {
+            'categories': {category['name']: category['product_count'] for category in categories},
+            'facets': client.get('/api/products/facets/').json()['in_stock'],
+            'suggested': sorted(result['name'] for result in suggested),
+        }
+        print(json.dumps(state), flush=True)
+
+
+WATCHER = """
+import sys, django
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = sys.argv[1]
+django.setup()
+from django.test.utils import setup_test_environment
+setup_test_environment()
+from products.tests import watch
+watch()
+"""
+
+
+@skipIf(
+    settings.DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+    and not settings.DATABASES['default'].get('TEST', {}).get('NAME'),
+    'needs a file-backed test database: --settings=ecommerce_backend.settings_test',
+)
+@override_settings(CHANGE_TRANSPORT='polling')
+class CacheCoherenceTests(TransactionTestCase):
+    """Changes made here must reach the per-process caches of other processes
+    (category list, suggest index, facet counts) through the polling transport."""
+
+    processes = 2
+    timeout = 10
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price=999, stock_quantity=5, category=self.category
+        )
+        env = {
+            **os.environ, 'CHANGE_TRANSPORT': 'polling', 'CHANGE_POLL_INTERVAL': '0.05',
+            'CACHE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'DATABASE_REPLICA_URLS': '',
+        }
+        self.watchers = [
+            subprocess.Popen(
+                [sys.executable, '-c', WATCHER, connection.settings_dict['NAME']], cwd=settings.BASE_DIR,
+                env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            )
+            for _ in range(self.processes)
+        ]
+        self.addCleanup(self.stop_watchers)
+        # Fill every process's caches before changing anything
+        for state in self.observe():
+            self.assertEqual(state['categories'], {'Laptops': 1})
+            self.assertEqual(state['facets'], {'true': 1, 'false': 0})
+
+    def stop_watchers(self):
+        for watcher in self.watchers:
+            watcher.stdin.close()
+            watcher.wait(10)
+            watcher.stdout.close()
+
+    def observe(self):
+        for watcher in self.watchers:
+            watcher.stdin.write('\n')
+            watcher.stdin.flush()
+        return [json.loads(watcher.stdout.readline()) for watcher in self.watchers]
+
+    def assertEventually(self, check):
+        started = time.monotonic()
+        while True:
+            states = self.observe()
+            if all(check(state) for state in states) or time.monotonic() - started > self.timeout:
+                break
+            time.sleep(0.05)
+        for state in states:
+            self.assertTrue(check(state), state)
+
+    def test_saves_and_deletes_reach_other_processes(self):
+        tablets = Category.objects.create(name='Tablets')
+        self.assertEventually(lambda state: 'Tablets' in state['categories'] and state['suggested'] == ['Tablets'])
+
+        self.product.stock_quantity = 0
+        self.product.save()
+        self.assertEventually(lambda state: state['facets'] == {'true': 0, 'false': 1})
+
+        tablets.delete()
+        self.assertEventually(lambda state: 'Tablets' not in state['categories'] and state['suggested'] == [])
+
+    def test_catalog_wide_event_reaches_other_processes(self):
+        # A bulk change sends no row events, only the catalog-wide one
+        Product.objects.update(is_active=False)
+        invalidate_catalog()
+        self.assertEventually(
+            lambda state: state['categories'] == {'Laptops': 0} and state['facets'] == {'true': 0, 'false': 0}
+        )
+
+
+class InventoryUpdateTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price='99999999.00', stock_quantity=5, category=category
+        )
+        admin = User.objects.create_user(
+            email='admin@example.com', username='admin', password='secret', first_name='A', last_name='B',
+            is_staff=True,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def update(self, **change):
+        return self.client.post('/api/products/inventory/', {'updates': [{'id': self.product.pk, **change}]}, format='json')
+
+    def test_deltas_apply(self):
+        response = self.update(stock_delta=-2, price_delta='-1.00')
+        self.assertEqual(response.status_code, 200)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock_quantity, str(self.product.price)), (3, '99999998.00'))
+
+    def test_negative_stock_is_rejected(self):
+        self.assertEqual(self.update(stock_delta=-6).status_code, 409)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 5)
+
+    def test_price_past_the_field_is_rejected(self):
+        self.assertEqual(self.update(price_delta='2.49').status_code, 409)
+        self.product.refresh_from_db()
+        self.assertEqual(str(self.product.price), '99999999.00')
+        self.assertEqual(self.client.get('/api/products/').status_code, 200)
+
+
+@override_settings(SUGGEST_MAX_PRODUCTS=1)
+class SuggestIndexTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Tablets')
+        self.older = Product.objects.create(name='Slate one', description='', price=10, category=category)
+        # Equally unpopular products rank newest first, so only this one is indexed
+        self.newer = Product.objects.create(name='Slate two', description='', price=10, category=category)
+        suggestions.index = None
+        self.addCleanup(setattr, suggestions, 'index', None)
+
+    def names(self):
+        return [label for _, label in suggestions.search('slate', 10)]
+
+    def save(self, product, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = name
+            product.save()
+
+    def test_saves_update_indexed_products_only(self):
+        self.assertEqual(self.names(), ['Slate two'])
+        self.save(self.newer, 'Slate deux')
+        self.save(self.older, 'Slate uno')
+        self.assertEqual(self.names(), ['Slate deux'])
+        self.assertEqual(suggestions.get().sizes['product'], 1)
+
+    def test_catalog_wide_change_rebuilds(self):
+        self.assertEqual(self.names(), ['Slate two'])
+        Product.objects.filter(pk=self.newer.pk).update(is_active=False)
+        dispatch(CATALOG, None)
+        self.assertEqual(self.names(), ['Slate one'])
+
+
+def make_user(number, **extra):
+    return User.objects.create_user(
+        email=f'user{number}@example.com', username=f'user{number}', password='secret',
+        first_name='User', last_name=str(number), **extra
+    )
+
+
+class ProductReviewTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price=999, stock_quantity=5, category=category
+        )
+        self.client = APIClient()
+        for number, rating in enumerate([5, 4, 4, 3, 5, 1, 5]):
+            self.client.force_authenticate(make_user(number))
+            self.client.post(f'/api/products/{self.product.pk}/reviews/', {'rating': rating, 'comment': 'Ok'})
+        self.client.force_authenticate(None)
+
+    def test_detail_embeds_latest_reviews_and_histogram(self):
+        data = self.client.get(f'/api/products/{self.product.pk}/').json()
+        self.assertEqual([review['user_name'] for review in data['reviews']], [f'User {n}' for n in (6, 5, 4, 3, 2)])
+        self.assertEqual(data['rating_histogram'], {'1': 1, '2': 0, '3': 1, '4': 2, '5': 3})
+        self.assertEqual((data['review_count'], data['average_rating']), (7, 3.9))
+
+    def test_reviews_are_cursor_paginated(self):
+        path = f'/api/products/{self.product.pk}/reviews/?page_size=4'
+        first = self.client.get(path).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual((len(first['results']), len(second['results'])), (4, 3))
+        self.assertIsNone(second['next'])
+        ids = [review['id'] for review in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 7)
+
+
+class RatingStatsTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Laptops')
+        self.product = Product.objects.create(
+            name='Notebook', description='13 inch', price=999, stock_quantity=5, category=category
+        )
+        self.user = make_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stats(self):
+        return self.client.get(f'/api/products/{self.product.pk}/rating-stats/').json()
+
+    def test_review_writes_keep_stats_current(self):
+        review = self.client.post(f'/api/products/{self.product.pk}/reviews/', {'rating': 2, 'comment': 'Meh'}).json()
+        self.assertEqual((self.stats()['histogram']['2'], self.stats()['rating_sum']), (1, 2))
+
+        self.client.patch(f'/api/reviews/{review["id"]}/', {'rating': 5})
+        stats = self.stats()
+        self.assertEqual((stats['histogram']['2'], stats['histogram']['5']), (0, 1))
+        self.assertEqual((stats['review_count'], stats['average_rating']), (1, 5.0))
+        call_command('rebuild_rating_stats', '--check', stdout=StringIO())
+
+        self.client.delete(f'/api/reviews/{review["id"]}/')
+        stats = self.stats()
+        self.assertEqual((stats['review_count'], stats['rating_sum']), (0, 0))
+        call_command('rebuild_rating_stats', '--check', stdout=StringIO())
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        self.client.post(f'/api/products/{self.product.pk}/reviews/', {'rating': 4, 'comment': 'Good'})
+        # A cascade delete bypasses the stats
+        self.user.delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rating_stats', '--check', stdout=StringIO())
+        call_command('rebuild_rating_stats', stdout=StringIO())
+        self.assertEqual(self.stats()['review_count'], 0)
+
+
+class ProductImportExportTests(TestCase):
+
+    def setUp(self):
+        laptops = Category.objects.create(name='Laptops')
+        Product.objects.create(name='Notebook', sku='NB-1', description='', price=999, category=laptops)
+        Product.objects.create(name='Sleeve', description='', price=20, category=laptops)
+        self.client = APIClient()
+        self.client.force_authenticate(make_user(1, is_staff=True))
+
+    def upload(self, content, name='products.csv'):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+
+    def test_import_upserts_by_sku_then_name(self):
+        response = self.upload(
+            'sku,name,price,category,stock_quantity\n'
+            'NB-1,Notebook Pro,1099.00,Laptops,3\n'
+            ',Sleeve,25.00,Laptops,7\n'
+            'TB-1,Tablet,499.00,Tablets,2\n'
+            'TB-2,Broken,-1,Tablets,2\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['rows'], report['created'], report['updated'], report['error_count']), (4, 1, 2, 1))
+        self.assertEqual(report['errors'][0]['row'], 4)
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(Product.objects.get(sku='NB-1').name, 'Notebook Pro')
+        self.assertEqual(Product.objects.get(name='Sleeve', sku__isnull=True).stock_quantity, 7)
+        self.assertEqual(Product.objects.get(sku='TB-1').category.name, 'Tablets')
+
+    def test_ndjson_import_reports_bad_lines(self):
+        lines = '{"sku": "TB-1", "name": "Tablet", "price": "499", "category": "Tablets"}\nnot json\n'
+        report = self.upload(lines, name='products.ndjson').json()
+        self.assertEqual((report['created'], report['error_count']), (1, 1))
+
+    def test_export_round_trips_through_import(self):
+        response = self.client.get('/api/products/export/')
+        self.assertEqual(response.status_code, 200)
+        exported = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(exported)))
+        self.assertEqual(sorted(row['name'] for row in rows), ['Notebook', 'Sleeve'])
+        report = self.upload(exported).json()
+        self.assertEqual((report['created'], report['updated'], report['error_count']), (0, 2, 0))
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class FastSerializationTests(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Laptops')
+        Product.objects.create(name='Notebook', description='13 inch', price='1099.00', stock_quantity=3, category=category)
+        Product.objects.create(name='Sleeve', description='Neoprene', price='25.50', stock_quantity=0, category=category)
+        user = make_user(1)
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post('/api/products/%d/reviews/' % Product.objects.get(name='Notebook').pk, {'rating': 4, 'comment': 'Good'}, format='json')
+
+    def serialized(self, fields=None):
+        products = Product.objects.select_related('category', 'rating_stats').order_by('-created_at')
+        request = APIRequestFactory().get('/api/products/')
+        serializer = ProductListSerializer(products, many=True, fields=fields, context={'request': request})
+        return json.loads(JSONRenderer().render(serializer.data))
+
+    def test_values_path_matches_serializer(self):
+        results = self.client.get('/api/products/').json()['results']
+        self.assertEqual(results, self.serialized())
+        self.assertEqual(results[1]['average_rating'], 4.0)
+
+    def test_values_path_honours_fields(self):
+        results = self.client.get('/api/products/?fields=id,name,is_in_stock').json()['results']
+        self.assertEqual(results, self.serialized(fields='id,name,is_in_stock'))
+        self.assertEqual(set(results[0]), {'id', 'name', 'is_in_stock'})
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'price': Decimal('19.90'),
+            'at': datetime(2024, 1, 2, 3, 4, 5, 600000, tzinfo=dt_timezone.utc),
+            'text': 'line\u2028break\u2029\xe9',
+            'items': [1, None, True],
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch('ecommerce_backend.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
@@ -6,8 +6,14 @@ urlpatterns = [
     path('categories/<int:pk>/', views.CategoryDetailView.as_view(), name='category-detail'),
     path('products/', views.ProductListView.as_view(), name='product-list'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
+    path('products/facets/', views.ProductFacetsView.as_view(), name='product-facets'),
+    path('products/suggest/', views.ProductSuggestView.as_view(), name='product-suggest'),
     path('products/featured/', views.FeaturedProductsView.as_view(), name='featured-products'),
+    path('products/import/', views.ProductImportView.as_view(), name='product-import'),
+    path('products/export/', views.ProductExportView.as_view(), name='product-export'),
+    path('products/inventory/', views.ProductInventoryUpdateView.as_view(), name='product-inventory-update'),
     path('products/search/', views.search_products, name='search-products'),
     path('products/<int:product_id>/reviews/', views.ProductReviewListCreateView.as_view(), name='product-reviews'),
+    path('products/<int:pk>/rating-stats/', views.ProductRatingStatsView.as_view(), name='product-rating-stats'),
     path('reviews/<int:pk>/', views.ProductReviewDetailView.as_view(), name='review-detail'),
 ]
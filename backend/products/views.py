@@ -1,19 +1,47 @@
-from rest_framework import generics, filters, permissions, status
+from rest_framework import generics, filters, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse
 from drf_spectacular.types import OpenApiTypes
-from .models import Category, Product, Review
+from ecommerce_backend.db_router import primary
+from ecommerce_backend.serialization import FieldSelectionMixin, ValuesListMixin
+from .models import Category, Product, Review, ProductRatingStats
+from .changes import LocalCache
+from .facets import cached_facet_counts
+from .suggest import suggestions
+from .pagination import ReviewCursorPagination
+from .bulk import (
+    CONTENT_TYPES,
+    IMPORT_FORMATS,
+    RENDERERS,
+    InventoryUpdateError,
+    ProductImporter,
+    apply_inventory_updates,
+    decode_lines,
+    export_rows,
+    guess_format,
+    parse_rows
+)
 from .serializers import (
     CategorySerializer, 
     ProductListSerializer, 
     ProductDetailSerializer,
     ProductCreateSerializer,
-    ReviewSerializer
+    ProductRatingStatsSerializer,
+    ReviewSerializer,
+    InventoryBulkUpdateSerializer
 )
 
+category_lists = LocalCache(settings.CATEGORY_LIST_CACHE_SIZE)
+
 @extend_schema_view(
     list=extend_schema(
         summary="List all categories",
@@ -33,9 +61,21 @@ from .serializers import (
     )
 )
 class CategoryListView(generics.ListCreateAPIView):
-    queryset = Category.objects.all().order_by('name')
+    queryset = Category.objects.annotate(
+        active_product_count=Count('products', filter=Q(products__is_active=True))
+    ).order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    def list(self, request, *args, **kwargs):
+        # Kept per process; any category or product change (product_count) evicts these
+        key = (request.get_host(), request.get_full_path())
+        data = category_lists.get(key)
+        if data is None:
+            with primary():
+                data = super().list(request, *args, **kwargs).data
+            category_lists.set(key, data, tags=['category', 'product'])
+        return Response(data)
 
 @extend_schema_view(
     retrieve=extend_schema(
@@ -74,6 +114,42 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+class ProductFilterMixin:
+    """Active products narrowed by the list filters: category, search, price range and stock."""
+    queryset = Product.objects.filter(is_active=True).order_by('-created_at')
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = ['category', 'category__name']
+    search_fields = ['name', 'description']
+    
+    def price_param(self, name):
+        """The price query parameter as a Decimal; a 400 rather than a failing query when invalid."""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return serializers.DecimalField(max_digits=None, decimal_places=None).to_internal_value(value)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({name: exc.detail})
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # Filter by price range
+        min_price = self.price_param('min_price')
+        max_price = self.price_param('max_price')
+        
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+        
+        # Filter by stock availability
+        in_stock = self.request.query_params.get('in_stock')
+        if in_stock and in_stock.lower() == 'true':
+            queryset = queryset.filter(stock_quantity__gt=0)
+        
+        return queryset
+
 @extend_schema_view(
     list=extend_schema(
         summary="List products",
@@ -131,11 +207,8 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         }
     )
 )
-class ProductListView(generics.ListCreateAPIView):
-    queryset = Product.objects.filter(is_active=True).order_by('-created_at')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'category__name']
-    search_fields = ['name', 'description']
+class ProductListView(ValuesListMixin, FieldSelectionMixin, ProductFilterMixin, generics.ListCreateAPIView):
+    filter_backends = [*ProductFilterMixin.filter_backends, filters.OrderingFilter]
     ordering_fields = ['price', 'created_at', 'name']
     ordering = ['-created_at']
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -144,25 +217,52 @@ class ProductListView(generics.ListCreateAPIView):
         if self.request.method == 'POST':
             return ProductCreateSerializer
         return ProductListSerializer
+
+@extend_schema(
+    summary="Product facet counts",
+    description="Number of products per category, price range and stock state for the same filters as the product list",
+    tags=['Products'],
+    parameters=[
+        OpenApiParameter(name='category', description='Filter by category ID', required=False, type=OpenApiTypes.INT),
+        OpenApiParameter(name='search', description='Search in name and description', required=False, type=OpenApiTypes.STR),
+        OpenApiParameter(name='min_price', description='Minimum price filter', required=False, type=OpenApiTypes.DECIMAL),
+        OpenApiParameter(name='max_price', description='Maximum price filter', required=False, type=OpenApiTypes.DECIMAL),
+        OpenApiParameter(name='in_stock', description='Only products in stock', required=False, type=OpenApiTypes.BOOL),
+    ],
+    responses={200: OpenApiResponse(description="Facet counts: count, categories, price, in_stock")}
+)
+class ProductFacetsView(ProductFilterMixin, generics.GenericAPIView):
+    permission_classes = [permissions.AllowAny]
     
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Filter by price range
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        # Filter by stock availability
-        in_stock = self.request.query_params.get('in_stock')
-        if in_stock and in_stock.lower() == 'true':
-            queryset = queryset.filter(stock_quantity__gt=0)
-        
-        return queryset
+    def get(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(cached_facet_counts(queryset, request.query_params))
+
+@extend_schema(
+    summary="Suggest products and categories",
+    description="Active product and category names starting with the query (at any word), most popular first",
+    tags=['Products'],
+    parameters=[
+        OpenApiParameter(name='q', description='Typed prefix', required=True, type=OpenApiTypes.STR),
+        OpenApiParameter(name='limit', description='Number of suggestions (default 10)', required=False, type=OpenApiTypes.INT),
+    ],
+    responses={200: OpenApiResponse(description="query and results: [{type, id, name}]")}
+)
+class ProductSuggestView(APIView):
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')[:settings.SUGGEST_MAX_QUERY_LENGTH]
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), settings.SUGGEST_MAX_RESULTS)
+        except ValueError:
+            limit = 10
+        results = [
+            {'type': kind, 'id': pk, 'name': name}
+            for (kind, pk), name in suggestions.search(query, limit)
+        ]
+        return Response({'query': query, 'results': results})
 
 @extend_schema_view(
     retrieve=extend_schema(
@@ -197,7 +297,7 @@ class ProductListView(generics.ListCreateAPIView):
         }
     )
 )
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(FieldSelectionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -208,13 +308,14 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     tags=['Products'],
     responses={200: ProductListSerializer(many=True)}
 )
-class FeaturedProductsView(generics.ListAPIView):
+class FeaturedProductsView(ValuesListMixin, FieldSelectionMixin, generics.ListAPIView):
+    queryset = Product.objects.filter(is_active=True, stock_quantity__gt=0)
     serializer_class = ProductListSerializer
     permission_classes = [permissions.AllowAny]
     
     def get_queryset(self):
         # Return products with highest ratings or most recent
-        return Product.objects.filter(is_active=True, stock_quantity__gt=0)[:8]
+        return super().get_queryset()[:8]
 
 @extend_schema(
     summary="Search products",
@@ -243,22 +344,43 @@ def search_products(request):
             Q(description__icontains=query) |
             Q(category__name__icontains=query),
             is_active=True
-        )
+        ).select_related('category', 'rating_stats')
         serializer = ProductListSerializer(products, many=True)
         return Response(serializer.data)
     return Response([])
 
+@extend_schema_view(
+    get=extend_schema(
+        summary="List product reviews",
+        description="Retrieve the reviews of a product, newest first, using cursor pagination",
+        tags=['Products'],
+        responses={200: ReviewSerializer(many=True)}
+    ),
+    post=extend_schema(
+        summary="Review a product",
+        description="Add a review to a product (requires authentication)",
+        tags=['Products'],
+        responses={
+            201: ReviewSerializer,
+            400: OpenApiResponse(description="Bad request"),
+            401: OpenApiResponse(description="Authentication required")
+        }
+    )
+)
 class ProductReviewListCreateView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewCursorPagination
     
     def get_queryset(self):
         product_id = self.kwargs['product_id']
-        return Review.objects.filter(product_id=product_id)
+        return Review.objects.filter(product_id=product_id).select_related('user')
     
+    @transaction.atomic
     def perform_create(self, serializer):
         product_id = self.kwargs['product_id']
-        serializer.save(product_id=product_id)
+        review = serializer.save(product_id=product_id)
+        ProductRatingStats.record(product_id, added=review.rating)
 
 class ProductReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ReviewSerializer
@@ -266,3 +388,133 @@ class ProductReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         return Review.objects.filter(user=self.request.user)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # Re-read under a row lock so concurrent edits each remove the rating they replace
+        previous_rating = Review.objects.select_for_update().values_list('rating', flat=True).get(pk=serializer.instance.pk)
+        review = serializer.save()
+        ProductRatingStats.record(review.product_id, added=review.rating, removed=previous_rating)
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        rating = Review.objects.select_for_update().filter(pk=instance.pk).values_list('rating', flat=True).first()
+        if rating is None:
+            return
+        ProductRatingStats.record(instance.product_id, removed=rating)
+        instance.delete()
+
+@extend_schema(
+    summary="Get product rating stats",
+    description="Retrieve per-star review counts, rating sum and average for a product",
+    tags=['Products'],
+    responses={
+        200: ProductRatingStatsSerializer,
+        404: OpenApiResponse(description="Product not found")
+    }
+)
+class ProductRatingStatsView(generics.RetrieveAPIView):
+    serializer_class = ProductRatingStatsSerializer
+    permission_classes = [permissions.AllowAny]
+    
+    def get_object(self):
+        product = get_object_or_404(
+            Product.objects.select_related('rating_stats'), pk=self.kwargs['pk'], is_active=True
+        )
+        return ProductRatingStats.for_product(product)
+
+@extend_schema(
+    summary="Bulk import products",
+    description="Upload a CSV or NDJSON file of products (admin only). Rows are upserted by SKU, "
+                "or by name for rows without a SKU; missing categories are created.",
+    tags=['Products'],
+    request={
+        'multipart/form-data': {
+            'type': 'object',
+            'properties': {
+                'file': {'type': 'string', 'format': 'binary'},
+                'file_format': {'type': 'string', 'enum': list(IMPORT_FORMATS)},
+            }
+        }
+    },
+    responses={
+        200: OpenApiResponse(description="Import report with per-row errors"),
+        400: OpenApiResponse(description="Missing file or unsupported format"),
+        403: OpenApiResponse(description="Admin access required")
+    }
+)
+class ProductImportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A file upload is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fmt = request.data.get('file_format') or guess_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        report = ProductImporter().run(parse_rows(decode_lines(upload), fmt))
+        return Response(report)
+
+@extend_schema(
+    summary="Bulk export products",
+    description="Stream every product as CSV or NDJSON (admin only)",
+    tags=['Products'],
+    parameters=[
+        OpenApiParameter(
+            name='file_format',
+            description='csv (default) or ndjson',
+            required=False,
+            type=OpenApiTypes.STR
+        )
+    ],
+    responses={
+        200: OpenApiResponse(description="Streamed product file"),
+        403: OpenApiResponse(description="Admin access required")
+    }
+)
+class ProductExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in RENDERERS:
+            return Response({'error': 'Unsupported file format'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(RENDERERS[fmt](export_rows()), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
+
+@extend_schema(
+    summary="Bulk update stock and prices",
+    description="Apply stock and price changes to many products in one transaction (admin only). "
+                "Each entry sets absolute values (stock_quantity, price) or relative adjustments "
+                "(stock_delta, price_delta).",
+    tags=['Products'],
+    request=InventoryBulkUpdateSerializer,
+    responses={
+        200: OpenApiResponse(description="Ids of updated and unknown products"),
+        400: OpenApiResponse(description="Bad request"),
+        403: OpenApiResponse(description="Admin access required"),
+        409: OpenApiResponse(description="Update would make stock or price negative, or out of range")
+    }
+)
+class ProductInventoryUpdateView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def post(self, request):
+        serializer = InventoryBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            result = apply_inventory_updates(serializer.validated_data['updates'])
+        except InventoryUpdateError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            'message': f"Updated {len(result['updated'])} product(s)",
+            **result
+        })
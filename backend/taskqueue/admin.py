@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Task
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name',)
+    ordering = ('-id',)
+    readonly_fields = ('created_at', 'locked_at', 'finished_at', 'last_error')
+    actions = ['requeue']
+    
+    @admin.action(description='Requeue selected tasks')
+    def requeue(self, request, queryset):
+        queryset.update(status='queued', run_at=timezone.now(), attempts=0, locked_by='', locked_at=None)
@@ -0,0 +1,29 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from taskqueue.worker import Worker
+
+class Command(BaseCommand):
+    help = 'Run a background task worker; start several processes for more concurrency'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--stats-interval', type=float, default=60, help='Seconds between throughput logs')
+        parser.add_argument('--max-tasks', type=int, help='Exit after this many tasks')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+    
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+        worker = Worker(batch_size=options['batch_size'])
+        self.stdout.write(f'Worker {worker.worker_id} started')
+        try:
+            worker.run(
+                poll_interval=options['poll_interval'],
+                stats_interval=options['stats_interval'],
+                max_tasks=options['max_tasks'],
+                burst=options['burst'],
+            )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(worker.stats_line())
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+from taskqueue.models import Task
+
+class Command(BaseCommand):
+    help = 'Show queue depth per status and recent task throughput'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=300, help='Throughput window in seconds')
+    
+    def handle(self, *args, **options):
+        for row in Task.objects.order_by().values('status').annotate(count=Count('id')).order_by('status'):
+            self.stdout.write(f"{row['status']:<10} {row['count']}")
+        
+        since = timezone.now() - timedelta(seconds=options['window'])
+        recent = Task.objects.filter(finished_at__gte=since).aggregate(
+            done=Count('id', filter=Q(status='done')),
+            failed=Count('id', filter=Q(status='failed')),
+        )
+        finished = recent['done'] + recent['failed']
+        self.stdout.write(
+            f"Last {options['window']}s: {recent['done']} done, {recent['failed']} failed, "
+            f"{finished / options['window']:.2f} tasks/sec"
+        )
+        
+        oldest = Task.objects.filter(status='queued', run_at__lte=timezone.now()).order_by('run_at').first()
+        if oldest:
+            self.stdout.write(f'Oldest ready task waiting {(timezone.now() - oldest.run_at).total_seconds():.1f}s')
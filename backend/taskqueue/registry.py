@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import transaction
+
+_registry = {}
+
+
+def task(func=None, *, name=None, max_attempts=3):
+    """Register ``func`` as a background task and give it an ``enqueue`` helper.
+
+    Arguments must be JSON serializable; pass ids rather than model instances.
+    """
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        func.task_name = task_name
+        func.max_attempts = max_attempts
+        func.enqueue = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        _registry[task_name] = func
+        return func
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(func, *args, run_at=None, **kwargs):
+    """Queue ``func(*args, **kwargs)`` once the current transaction commits.
+
+    Nothing is queued if the transaction rolls back. With TASK_ALWAYS_EAGER the
+    task runs in-process after commit instead, which is handy without a worker.
+    """
+    from .models import Task
+
+    def submit():
+        if getattr(settings, 'TASK_ALWAYS_EAGER', False):
+            func(*args, **kwargs)
+            return
+        fields = {'run_at': run_at} if run_at else {}
+        Task.objects.create(
+            name=func.task_name,
+            payload={'args': list(args), 'kwargs': kwargs},
+            max_attempts=func.max_attempts,
+            **fields
+        )
+
+    transaction.on_commit(submit)
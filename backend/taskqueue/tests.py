@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .registry import task
+from .worker import Worker
+
+calls = []
+
+
+@task(name='taskqueue.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='taskqueue.tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@override_settings(TASK_ALWAYS_EAGER=False)
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_tasks_are_queued_only_when_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record.enqueue('kept')
+        try:
+            with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+                record.enqueue('rolled back')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(list(Task.objects.values_list('payload', flat=True)), [{'args': ['kept'], 'kwargs': {}}])
+
+        self.assertEqual(Worker().run_once(), 1)
+        self.assertEqual(calls, ['kept'])
+        self.assertEqual(Task.objects.get().status, 'done')
+
+    def test_a_task_is_claimed_by_one_worker_only(self):
+        for value in range(3):
+            Task.objects.create(name=record.task_name, payload={'args': [value]})
+        first, second = Worker(batch_size=2), Worker(batch_size=2)
+        second.worker_id += ':second'
+        claimed = [task.pk for task in first.claim()] + [task.pk for task in second.claim()]
+        self.assertEqual(len(claimed), 3)
+        self.assertEqual(len(set(claimed)), 3)
+        self.assertEqual(second.claim(), [])
+
+    def test_failures_back_off_then_fail(self):
+        Task.objects.create(name=explode.task_name, max_attempts=2)
+        worker = Worker(retry_delay=10)
+        with self.assertLogs('taskqueue.worker', 'WARNING'):
+            worker.run_once()
+        queued = Task.objects.get()
+        self.assertEqual((queued.status, queued.attempts), ('queued', 1))
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertIn('boom', queued.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('taskqueue.worker', 'WARNING'):
+            worker.run_once()
+        self.assertEqual(Task.objects.get().status, 'failed')
+
+    def test_stale_tasks_are_requeued_or_failed(self):
+        stale = timezone.now() - timedelta(hours=1)
+        retry = Task.objects.create(name=record.task_name, status='running', attempts=1, locked_at=stale)
+        exhausted = Task.objects.create(name=record.task_name, status='running', attempts=3, locked_at=stale)
+        recent = Task.objects.create(name=record.task_name, status='running', attempts=1, locked_at=timezone.now())
+        with self.assertLogs('taskqueue.worker', 'WARNING'):
+            self.assertEqual(Worker(lock_timeout=600).requeue_stale(), 1)
+        statuses = dict(Task.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[retry.pk], statuses[exhausted.pk], statuses[recent.pk]], ['queued', 'failed', 'running']
+        )
@@ -0,0 +1,121 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Claim and run queued tasks; several worker processes can share one queue.
+
+    Tasks are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+    supports it, followed by a conditional UPDATE so that a task can only move
+    from queued to running once, even on SQLite.
+    """
+
+    def __init__(self, batch_size=10, retry_delay=10, lock_timeout=600):
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.lock_timeout = lock_timeout
+        self.processed = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def claim(self):
+        now = timezone.now()
+        skip_locked = connection.features.has_select_for_update_skip_locked
+        # Without SKIP LOCKED (SQLite) the conditional UPDATE alone arbitrates, and
+        # a read transaction upgraded to a write would fail under contention
+        with transaction.atomic() if skip_locked else nullcontext():
+            candidates = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+            if skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            ids = list(candidates.values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                return []
+            Task.objects.filter(pk__in=ids, status='queued').update(
+                status='running', locked_by=self.worker_id, locked_at=now, attempts=F('attempts') + 1
+            )
+        return list(Task.objects.filter(pk__in=ids, status='running', locked_by=self.worker_id, locked_at=now))
+
+    def execute(self, task):
+        try:
+            func = get_task(task.name)
+            func(*task.payload.get('args', []), **task.payload.get('kwargs', {}))
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning('Task %s (%s) failed on attempt %s', task.pk, task.name, task.attempts)
+            self.failed += 1
+            if task.attempts < task.max_attempts:
+                # Exponential backoff: retry_delay, 2x, 4x, ...
+                delay = self.retry_delay * 2 ** (task.attempts - 1)
+                Task.objects.filter(pk=task.pk).update(
+                    status='queued', run_at=timezone.now() + timedelta(seconds=delay),
+                    locked_by='', locked_at=None, last_error=error
+                )
+            else:
+                Task.objects.filter(pk=task.pk).update(
+                    status='failed', finished_at=timezone.now(), last_error=error
+                )
+            return
+        self.processed += 1
+        Task.objects.filter(pk=task.pk).update(status='done', finished_at=timezone.now(), last_error='')
+
+    def requeue_stale(self):
+        """Give tasks held by a worker that died mid-run back to the queue.
+
+        A task that has used up its attempts is failed instead: one that kills
+        its worker (OOM, segfault) would otherwise take down a worker forever.
+        """
+        now = timezone.now()
+        stale = Task.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=self.lock_timeout))
+        exhausted = stale.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', finished_at=now, locked_by='', locked_at=None,
+            last_error=f'Worker stopped while running the task (lock older than {self.lock_timeout} s)'
+        )
+        if exhausted:
+            logger.warning('Failed %s tasks whose worker stopped on their last attempt', exhausted)
+        return stale.filter(attempts__lt=F('max_attempts')).update(status='queued', locked_by='', locked_at=None)
+
+    def run_once(self):
+        tasks = self.claim()
+        for task in tasks:
+            self.execute(task)
+        return len(tasks)
+
+    def throughput(self):
+        elapsed = time.monotonic() - self.started
+        return (self.processed + self.failed) / elapsed if elapsed else 0.0
+
+    def run(self, poll_interval=1.0, stats_interval=60, max_tasks=None, burst=False):
+        last_stats = time.monotonic()
+        self.requeue_stale()
+        while max_tasks is None or self.processed + self.failed < max_tasks:
+            close_old_connections()
+            handled = self.run_once()
+            if time.monotonic() - last_stats >= stats_interval:
+                self.requeue_stale()
+                logger.info(self.stats_line())
+                last_stats = time.monotonic()
+            if not handled:
+                if burst and not Task.objects.filter(status='queued', run_at__lte=timezone.now()).exists():
+                    break
+                time.sleep(poll_interval)
+
+    def stats_line(self):
+        return (
+            f'{self.worker_id}: {self.processed} done, {self.failed} failed attempts, '
+            f'{self.throughput():.1f} tasks/sec'
+        )